@@ -0,0 +1,121 @@
+"""
+Measures encode time and payload size of image encoding profiles on sample
+frames, to tune what is uploaded to the agent and vision models.
+
+    python -m benchmarks.encoding [frames_dir] [--repeat 10]
+
+Without a directory a synthetic phone-sized frame is used.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from phone_agent.tools.encoding import (
+    EncodingProfile,
+    agent_profile,
+    encode,
+    vision_profile,
+)
+from phone_agent.tools.tracing import nearest_rank
+
+PROFILES = {
+    "agent (env)": agent_profile,
+    "vision (env)": vision_profile,
+    "png": EncodingProfile(format="PNG"),
+    "png fast": EncodingProfile(format="PNG", compress_level=1),
+    "png 1024": EncodingProfile(format="PNG", max_width=512, max_height=1024),
+    "jpeg 85": EncodingProfile(format="JPEG", quality=85),
+    "jpeg 60": EncodingProfile(format="JPEG", quality=60),
+    "jpeg 85 1024": EncodingProfile(
+        format="JPEG", quality=85, max_width=512, max_height=1024
+    ),
+    "jpeg 85 1024 bilinear": EncodingProfile(
+        format="JPEG", quality=85, max_width=512, max_height=1024, resample="BILINEAR"
+    ),
+    "jpeg 85 gray": EncodingProfile(format="JPEG", quality=85, grayscale=True),
+    "webp 80": EncodingProfile(format="WEBP", quality=80),
+    "webp 80 1024": EncodingProfile(
+        format="WEBP", quality=80, max_width=512, max_height=1024
+    ),
+}
+
+
+def synthetic_frame(
+    width: int = 625, height: int = 1337, variant: int = 0
+) -> Image.Image:
+    """
+    A rough stand-in for a phone screen: a wallpaper gradient, icons and text.
+    Each `variant` recolours the icons, to fake moving between screens.
+    """
+    img = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(img)
+    for y in range(height):
+        draw.line([(0, y), (width, y)], fill=(30, 60 + y * 120 // height, 140))
+    for row in range(6):
+        for col in range(4):
+            x, y = 40 + col * 145, 120 + row * 170
+            draw.rounded_rectangle(
+                (x, y, x + 110, y + 110),
+                radius=24,
+                fill=((row * 40 + variant * 70) % 255, (col * 60) % 255, 200),
+            )
+            draw.text((x + 20, y + 120), f"App {row}{col}", fill="white")
+    return img
+
+
+def load_frames(directory: str) -> list[Image.Image]:
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+            with Image.open(os.path.join(directory, name)) as img:
+                frames.append(img.convert("RGB"))
+    return frames
+
+
+def run(frames: list[Image.Image], repeat: int) -> list[dict]:
+    results = []
+    for name, profile in PROFILES.items():
+        timings, sizes = [], []
+        for frame in frames:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data, _ = encode(frame, profile)
+                timings.append((time.perf_counter() - start) * 1000)
+                sizes.append(len(data))
+        timings.sort()
+        results.append(
+            {
+                "profile": name,
+                "median_ms": statistics.median(timings),
+                "p95_ms": nearest_rank(timings, 0.95),
+                "mean_kb": statistics.mean(sizes) / 1024,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("frames_dir", nargs="?")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames_dir) if args.frames_dir else [synthetic_frame()]
+    if not frames:
+        parser.error(f"No frames found in {args.frames_dir}")
+
+    print(f"{len(frames)} frame(s), {args.repeat} encodes each\n")
+    print(f"{'profile':<24}{'median ms':>12}{'p95 ms':>10}{'mean KB':>10}")
+    for result in run(frames, args.repeat):
+        print(
+            f"{result['profile']:<24}{result['median_ms']:>12.1f}"
+            f"{result['p95_ms']:>10.1f}{result['mean_kb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
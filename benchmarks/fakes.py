@@ -0,0 +1,304 @@
+"""
+Local stand-ins for the services the agent talks to, so the full loop runs on
+Linux without a phone, a display or Vertex AI.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import errors, types
+from PIL import Image
+
+from phone_agent.tools.encoding import image_tokens
+
+_NUMBERED_QUERY = re.compile(r"^(\d+): (.+)$", re.MULTILINE)
+
+
+def _text_of(contents) -> str:
+    texts = []
+    for content in contents:
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, types.Part) and content.text:
+            texts.append(content.text)
+    return "\n".join(texts)
+
+
+def canned_box(query: str, label: str = None) -> dict:
+    """A stable bounding box per query, anywhere on the 0-1000 grid."""
+    digest = hashlib.sha1(query.encode()).digest()
+    y, x = 100 + digest[0] * 3, 100 + digest[1] * 3
+    return {"box_2d": [y, x, y + 60, x + 60], "label": label or query}
+
+
+def usage(prompt_tokens: int, output_tokens: int, cached_tokens: int = 0):
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        cached_content_token_count=cached_tokens or None,
+        total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+def instruction_tokens(config) -> int:
+    """Rough token count of the system instruction and tool declarations."""
+    if config is None:
+        return 0
+    tokens = 0
+    if config.system_instruction:
+        tokens += len(str(config.system_instruction)) // 4
+    for tool in config.tools or []:
+        if isinstance(tool, types.Tool):
+            tokens += len(tool.model_dump_json(exclude_none=True)) // 4
+    return tokens
+
+
+class FakeCaches:
+    """
+    Keeps cached contents in memory like `client.aio.caches`. Prompts below
+    `min_tokens` are refused, as the service does.
+    """
+
+    def __init__(self, min_tokens: int = 0):
+        self.min_tokens = min_tokens
+        self.entries: dict[str, int] = {}
+        self.created = 0
+        self.updated = 0
+
+    async def create(self, model, config=None):
+        tokens = instruction_tokens(config)
+        if tokens < self.min_tokens:
+            raise errors.ClientError(
+                400,
+                {
+                    "error": {
+                        "message": f"Cached content is too small, {tokens} tokens",
+                        "status": "INVALID_ARGUMENT",
+                    }
+                },
+            )
+        self.created += 1
+        name = f"cachedContents/{self.created}"
+        self.entries[name] = tokens
+        return types.CachedContent(name=name, model=model)
+
+    async def update(self, name, config=None):
+        if name not in self.entries:
+            raise errors.ClientError(
+                404, {"error": {"message": "not found", "status": "NOT_FOUND"}}
+            )
+        self.updated += 1
+        return types.CachedContent(name=name)
+
+    def tokens(self, config) -> int:
+        """The cached tokens a request reuses, raises for an unknown cache."""
+        if config is None or not config.cached_content:
+            return 0
+        if config.cached_content not in self.entries:
+            raise errors.ClientError(
+                404, {"error": {"message": "not found", "status": "NOT_FOUND"}}
+            )
+        return self.entries[config.cached_content]
+
+
+class FakeModels:
+    """
+    Answers spatial-understanding requests with canned bounding boxes. A
+    `failure_rate` share of calls fails with a 429 or 503 and a `slow_rate`
+    share takes `slow_latency` instead of `latency`, to exercise retries and
+    hedging.
+
+    With `elements` above one, a single query is answered like a busy screen:
+    the queried box is listed at a random position among distractors, and
+    each box takes `element_latency` to generate on top of `latency`, the
+    time to the first token. Streamed answers arrive box by box.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+        elements: int = 1,
+        element_latency: float = 0.0,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.elements = elements
+        self.element_latency = element_latency
+        self.calls = 0
+        # Image bytes uploaded, and the input tokens they would be billed
+        self.bytes = 0
+        self.image_tokens = 0
+        # Instruction tokens sent with the requests, and read from the cache
+        self.instruction_tokens = 0
+        self.cached_tokens = 0
+        self.caches = FakeCaches()
+        self._random = random.Random(seed)
+
+    def _instruction(self, config) -> int:
+        """Counts the instruction of a request, returns the cached part."""
+        cached = self.caches.tokens(config)
+        self.instruction_tokens += instruction_tokens(config)
+        self.cached_tokens += cached
+        return cached
+
+    def _boxes(self, contents) -> list[dict]:
+        self.calls += 1
+        for content in contents:
+            if isinstance(content, types.Part) and content.inline_data:
+                self.bytes += len(content.inline_data.data)
+                with Image.open(io.BytesIO(content.inline_data.data)) as img:
+                    self.image_tokens += image_tokens(*img.size)
+        prompt = _text_of(contents)
+        numbered = _NUMBERED_QUERY.findall(prompt)
+        if numbered:
+            return [
+                {**canned_box(query), "query": int(index)} for index, query in numbered
+            ]
+        query = prompt.rsplit(":", 1)[-1].strip()
+        boxes = [
+            canned_box(f"{query} {i}", label=f"unrelated element {i}")
+            for i in range(self.elements - 1)
+        ]
+        position = self._random.randrange(self.elements) if boxes else 0
+        boxes.insert(position, canned_box(query))
+        return boxes
+
+    async def _first_token(self) -> None:
+        """Waits out the time to the first token, or fails the call."""
+        if self._random.random() < self.failure_rate:
+            await asyncio.sleep(self.latency)
+            if self._random.random() < 0.5:
+                raise errors.ClientError(
+                    429, {"error": {"message": "quota", "status": "RESOURCE_EXHAUSTED"}}
+                )
+            raise errors.ServerError(
+                503, {"error": {"message": "overloaded", "status": "UNAVAILABLE"}}
+            )
+        slow = self._random.random() < self.slow_rate
+        await asyncio.sleep(self.slow_latency if slow else self.latency)
+
+    async def generate_content(self, model, contents, config=None):
+        cached = self._instruction(config)
+        await self._first_token()
+        boxes = self._boxes(contents)
+        await asyncio.sleep(self.element_latency * len(boxes))
+        text = json.dumps(boxes)
+        return SimpleNamespace(
+            text=text, usage_metadata=usage(1300, len(text) // 4, cached)
+        )
+
+    async def generate_content_stream(self, model, contents, config=None):
+        cached = self._instruction(config)
+        await self._first_token()
+        boxes = self._boxes(contents)
+
+        async def chunks():
+            yield SimpleNamespace(text="```json\n[", usage_metadata=None)
+            for i, box in enumerate(boxes):
+                text = ("," if i else "") + json.dumps(box)
+                # Split boxes across chunks, as tokens would
+                for piece in (text[: len(text) // 2], text[len(text) // 2 :]):
+                    await asyncio.sleep(self.element_latency / 2)
+                    yield SimpleNamespace(text=piece, usage_metadata=None)
+            text = json.dumps(boxes)
+            yield SimpleNamespace(
+                text="]\n```", usage_metadata=usage(1300, len(text) // 4, cached)
+            )
+
+        return chunks()
+
+
+class FakeGenaiClient:
+    """Quacks like `genai.Client` for the parts of it the tools use."""
+
+    def __init__(self, latency: float = 0.0, min_cache_tokens: int = 0, **faults):
+        self.models = FakeModels(latency, **faults)
+        self.caches = self.models.caches
+        self.caches.min_tokens = min_cache_tokens
+        self.aio = SimpleNamespace(models=self.models, caches=self.caches)
+
+
+# One task worth of tool calls, repeated until the step budget is spent
+SCRIPT = [
+    ("take_screenshot", {}),
+    ("locate_UI_elements", {"query": "the settings icon"}),
+    ("tap_at_coordinates", {"x": 150, "y": 300}),
+    (
+        "locate_multiple_UI_elements",
+        {"queries": ["the search field", "the cancel button"]},
+    ),
+    ("move_pointer", {"x": 120, "y": 200}),
+    ("click_and_screenshot", {}),
+    ("enter_keys", {"text": "hello world"}),
+    ("scroll_screen", {"direction": "down"}),
+    ("take_screenshot", {}),
+]
+
+
+class ScriptedLlm(BaseLlm):
+    """
+    Plays the agent model: returns the scripted tool calls one per turn, then
+    calls `human_intervention` to end the loop. The turn is read from the
+    request, so concurrent sessions each follow the script. Reports a rough
+    token count for the request, so history growth shows up in traces.
+    """
+
+    model: str = "scripted"
+    steps: int = 50
+    latency: float = 0.0
+    # The FakeCaches cached instructions are looked up in
+    caches: Any = None
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+        turn = sum(
+            1 for content in llm_request.contents or [] if content.role == "model"
+        )
+
+        prompt_tokens = instruction_tokens(llm_request.config)
+        cached_tokens = 0
+        if self.caches is not None:
+            cached_tokens = self.caches.tokens(llm_request.config)
+            prompt_tokens += cached_tokens
+        for content in llm_request.contents or []:
+            for part in content.parts or []:
+                if part.text:
+                    prompt_tokens += len(part.text) // 4
+                elif part.inline_data:
+                    prompt_tokens += 258
+
+        if turn < self.steps:
+            name, args = SCRIPT[turn % len(SCRIPT)]
+            part = types.Part(
+                function_call=types.FunctionCall(
+                    name=name, args={"explanation": "benchmark", **args}
+                )
+            )
+        elif turn == self.steps:
+            part = types.Part(
+                function_call=types.FunctionCall(
+                    name="human_intervention", args={"explanation": "done"}
+                )
+            )
+        else:
+            part = types.Part(text="Task complete.")
+
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=usage(prompt_tokens, 20, cached_tokens),
+        )
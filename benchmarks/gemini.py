@@ -0,0 +1,100 @@
+"""
+Measures how the Gemini client policies (retries, hedging) shape success rate
+and tail latency of vision calls, against a fake client with injected errors
+and slow responses.
+
+    python -m benchmarks.gemini [--calls 200] [--concurrency 8] [--latency 0.2]
+        [--slow-rate 0.05] [--slow-latency 2] [--failure-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), "../phone_agent/.env.local"))
+
+from benchmarks.fakes import FakeGenaiClient  # noqa: E402
+from phone_agent.tools.gemini import GeminiClient  # noqa: E402
+
+
+def policies(latency: float) -> dict[str, dict]:
+    return {
+        "single attempt": {"max_retries": 0},
+        "retries": {"max_retries": 4},
+        "retries + hedge": {"max_retries": 4, "hedge_after": latency * 3},
+    }
+
+
+async def run(client: GeminiClient, calls: int, concurrency: int) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failed = [], 0
+
+    async def call() -> None:
+        nonlocal failed
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await client.generate_content(
+                    model="fake", contents=["Here is what you should focus on: x"]
+                )
+            except Exception:
+                failed += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    wall = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "success": 1 - failed / calls,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "attempts": client.metrics.attempts / calls,
+        "calls_per_s": calls / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(
+        f"{args.calls} calls, {args.concurrency} at a time, {args.latency}s latency, "
+        f"{args.slow_rate:.0%} slow, {args.failure_rate:.0%} failing\n"
+    )
+    print(
+        f"{'policy':<18}{'success':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'attempts':>10}{'calls/s':>9}"
+    )
+    for name, policy in policies(args.latency).items():
+        fake = FakeGenaiClient(
+            latency=args.latency,
+            failure_rate=args.failure_rate,
+            slow_rate=args.slow_rate,
+            slow_latency=args.slow_latency,
+            seed=0,
+        )
+        client = GeminiClient(fake, backoff_base=0.1, backoff_max=1.0, **policy)
+        result = asyncio.run(run(client, args.calls, args.concurrency))
+        print(
+            f"{name:<18}{result['success']:>9.1%}{result['p50_ms']:>9.0f}"
+            f"{result['p95_ms']:>9.0f}{result['p99_ms']:>9.0f}"
+            f"{result['attempts']:>10.2f}{result['calls_per_s']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Runs the full agent loop offline and measures the overhead it adds per step,
+memory growth across steps and steps per second.
+
+    python -m benchmarks.loop [frames_dir] [--steps 50] [--runs 3]
+        [--devices 1] [--model-latency 0] [--vision-latency 0]
+        [--context-cache] [--min-cache-tokens 1024]
+
+The agent model, the Gemini vision client, screen capture and input injection
+are replaced by local fakes (see benchmarks/fakes.py), so it runs on Linux
+without a phone. Without a directory, synthetic frames are replayed. Injected
+fake latencies are subtracted from the reported overhead. With --devices, that
+many sessions run concurrently through the scheduler, each on its own replayed
+device.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+# Settings the benchmark relies on, before phone_agent reads its config
+BENCHMARK_ENV = {
+    "INPUT_BACKEND": "null",
+    "CAPTURE_BACKEND": "replay",
+    "CAPTURE_REPLAY_LOOP": "true",
+    "GEMINI_PRO_MODEL": "scripted",
+    "GEMINI_FLASH_MODEL": "fake",
+    "RECORD_SESSIONS": "false",
+    "LOCATE_CACHE_PATH": "",
+    "NAVIGATION_MEMORY_PATH": "",
+    "TEXT_INPUT_STRATEGY": "type",
+    "TEXT_INPUT_INTERVAL": "0",
+}
+for key, value in BENCHMARK_ENV.items():
+    os.environ.setdefault(key, value)
+load_dotenv(os.path.join(os.path.dirname(__file__), "../phone_agent/.env.local"))
+
+from google.adk.runners import InMemoryRunner  # noqa: E402
+
+from benchmarks.encoding import load_frames, synthetic_frame  # noqa: E402
+from benchmarks.fakes import FakeGenaiClient, ScriptedLlm  # noqa: E402
+from phone_agent import agent  # noqa: E402
+from phone_agent.scheduler import Job, run_sessions  # noqa: E402
+from phone_agent.tools.context_cache import context_cache  # noqa: E402
+from phone_agent.tools.device import (  # noqa: E402
+    DeviceContext,
+    get_device,
+    register_device,
+)
+from phone_agent.tools.gemini import gemini_client  # noqa: E402
+from phone_agent.tools.injection import NullInputBackend, set_input  # noqa: E402
+from phone_agent.tools.tracing import tracer  # noqa: E402
+
+APP_NAME = "phone_agent_benchmark"
+
+
+class SummaryCollector:
+    """Trace exporter keeping the summaries reported when sessions end."""
+
+    def __init__(self):
+        self.summaries = {}
+
+    def export(self, record: dict) -> None:
+        if record["type"] == "summary":
+            self.summaries[record["session"]] = record["spans"]
+
+
+def write_synthetic_frames(directory: str, count: int = 4) -> None:
+    for variant in range(count):
+        synthetic_frame(variant=variant).save(
+            os.path.join(directory, f"{variant:03d}.png")
+        )
+
+
+def register_devices(frames_dir: str, count: int) -> list[str]:
+    """Side by side copies of the default device, each replaying the frames."""
+    base = get_device()
+    names = []
+    for index in range(count):
+        device = DeviceContext.from_dict(
+            {
+                "name": f"benchmark-{index}",
+                "x_offset": base.x_offset + index * base.x_bound,
+                "replay_dir": frames_dir,
+            },
+            base,
+        )
+        register_device(device)
+        names.append(device.name)
+    return names
+
+
+async def benchmark(frames_dir: str, args) -> list[dict]:
+    names = register_devices(frames_dir, args.devices)
+    inputs = NullInputBackend()
+    set_input(inputs)
+    fake_client = FakeGenaiClient(
+        latency=args.vision_latency, min_cache_tokens=args.min_cache_tokens
+    )
+    gemini_client.client = fake_client
+    context_cache.enabled = args.context_cache
+    agent.phone_agent.model = ScriptedLlm(
+        steps=args.steps, latency=args.model_latency, caches=fake_client.caches
+    )
+
+    collector = SummaryCollector()
+    tracer.exporters.append(collector)
+    runner = InMemoryRunner(agent=agent.root_agent, app_name=APP_NAME)
+    jobs = [Job(device=name, task="Open settings.") for name in names]
+    steps = args.steps * len(jobs)
+
+    results = []
+    tracemalloc.start()
+    try:
+        for _ in range(args.runs):
+            vision_calls = fake_client.models.calls
+            memory_before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+            start = time.perf_counter()
+            sessions = await run_sessions(jobs, runner=runner, user_id="benchmark")
+            wall = time.perf_counter() - start
+
+            memory_after, memory_peak = tracemalloc.get_traced_memory()
+            errors = [result for result in sessions if result["status"] != "completed"]
+            if errors:
+                raise RuntimeError(f"Sessions failed: {errors}")
+
+            # Latency injected into one session, sessions overlap: the scripted
+            # steps plus the human_intervention and final turns, and its share
+            # of the vision calls
+            vision_calls = fake_client.models.calls - vision_calls
+            injected = (args.steps + 2) * args.model_latency + (
+                vision_calls / len(jobs)
+            ) * args.vision_latency
+            results.append(
+                {
+                    "wall_s": wall,
+                    "overhead_ms": (wall - injected) * 1000 / args.steps,
+                    "steps_per_s": steps / wall,
+                    "growth_mb": (memory_after - memory_before) / 2**20,
+                    "peak_mb": (memory_peak - memory_before) / 2**20,
+                    "summary": collector.summaries.get(sessions[-1]["session"], {}),
+                }
+            )
+    finally:
+        tracemalloc.stop()
+        tracer.exporters.remove(collector)
+
+    print(f"input events: {dict(inputs.events)}")
+    if args.context_cache:
+        print(f"context caches: {context_cache.metrics}")
+    return results
+
+
+def print_spans(summary: dict) -> None:
+    print(
+        f"{'span':<36}{'count':>7}{'total ms':>11}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'tokens in':>11}{'cached':>9}"
+    )
+    for name, entry in sorted(
+        summary.items(), key=lambda item: item[1]["total_ms"], reverse=True
+    ):
+        print(
+            f"{name:<36}{entry['count']:>7}{entry['total_ms']:>11.0f}"
+            f"{entry['p50_ms']:>9.0f}{entry['p95_ms']:>9.0f}"
+            f"{entry.get('prompt_tokens', ''):>11}"
+            f"{entry.get('cached_tokens', ''):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("frames_dir", nargs="?")
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--model-latency", type=float, default=0.0)
+    parser.add_argument("--vision-latency", type=float, default=0.0)
+    parser.add_argument(
+        "--context-cache",
+        action="store_true",
+        help="cache the agent and vision instructions in the fake context cache",
+    )
+    parser.add_argument(
+        "--min-cache-tokens",
+        type=int,
+        default=1024,
+        help="smallest prompt the fake context cache accepts",
+    )
+    parser.add_argument(
+        "--spans",
+        action="store_true",
+        help="print the span summary of the last session",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        frames_dir = args.frames_dir
+        if frames_dir is None:
+            frames_dir = synthetic_dir
+            write_synthetic_frames(frames_dir)
+        elif not load_frames(frames_dir):
+            parser.error(f"No frames found in {frames_dir}")
+        results = asyncio.run(benchmark(frames_dir, args))
+
+    print(f"{args.steps} steps per session, {args.devices} session(s) per run\n")
+    print(
+        f"{'run':<6}{'wall s':>9}{'overhead ms/step':>18}{'steps/s':>10}"
+        f"{'growth MB':>11}{'peak MB':>9}"
+    )
+    for index, result in enumerate(results, start=1):
+        print(
+            f"{index:<6}{result['wall_s']:>9.2f}{result['overhead_ms']:>18.1f}"
+            f"{result['steps_per_s']:>10.1f}{result['growth_mb']:>11.1f}"
+            f"{result['peak_mb']:>9.1f}"
+        )
+    if args.spans and results:
+        print()
+        print_spans(results[-1]["summary"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures what building the vision system instruction and generation config
+costs per call, rebuilt every time versus `vision.generation_config`, which
+the prompt registry hands out.
+
+    python -m benchmarks.prompts [--repeat 2000]
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import jinja2
+from dotenv import load_dotenv
+from google.genai import types
+
+load_dotenv(os.path.join(os.path.dirname(__file__), "../phone_agent/.env.local"))
+
+from phone_agent.templates import PROMPTS_DIR, PromptRegistry  # noqa: E402
+from phone_agent.tools import vision  # noqa: E402
+from phone_agent.tools.tracing import nearest_rank  # noqa: E402
+
+
+def rebuild(batch: bool) -> types.GenerateContentConfig:
+    """What every spatial understanding call would do without the registry."""
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(PROMPTS_DIR),
+        autoescape=jinja2.select_autoescape(),
+    )
+    schema = vision.config["VISION_RESPONSE_SCHEMA"]
+    settings = {}
+    if schema:
+        settings = {
+            "response_mime_type": "application/json",
+            "response_schema": vision.response_schema(batch),
+        }
+    return types.GenerateContentConfig(
+        system_instruction=env.get_template("vision.j2").render(
+            batch=batch, schema=schema
+        ),
+        temperature=0.5,
+        safety_settings=vision.SAFETY_SETTINGS,
+        **settings,
+    )
+
+
+def with_registry(registry: PromptRegistry):
+    """`vision.generation_config` served by the given registry."""
+
+    def build(batch: bool) -> types.GenerateContentConfig:
+        vision.prompt_registry = registry
+        return vision.generation_config(batch)
+
+    return build
+
+
+def measure(build, repeat: int) -> list[float]:
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        build(i % 2 == 0)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    builds = {
+        "rebuilt per call": rebuild,
+        "generation_config": with_registry(PromptRegistry(PROMPTS_DIR)),
+        "generation_config, reload": with_registry(
+            PromptRegistry(PROMPTS_DIR, hot_reload=True)
+        ),
+    }
+    print(f"{args.repeat} calls each\n")
+    print(f"{'build':<28}{'median us':>12}{'p99 us':>10}{'max us':>10}")
+    for name, build in builds.items():
+        timings = measure(build, args.repeat)
+        print(
+            f"{name:<28}{statistics.median(timings):>12.1f}"
+            f"{nearest_rank(timings, 0.99):>10.1f}{timings[-1]:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures cold import time of the agent with `python -X importtime` and fails
+when it exceeds a budget, so startup regressions are caught.
+
+    python -m benchmarks.startup [--module phone_agent.agent] [--budget-ms 2500]
+        [--runs 5] [--top 12]
+
+Each run imports the module in a fresh interpreter. The breakdown sums the
+self time of every module by top-level package, leaving out what the
+interpreter imports at startup anyway.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess  # nosec
+import sys
+from collections import defaultdict
+
+from dotenv import dotenv_values
+
+ENV_FILE = os.path.join(os.path.dirname(__file__), "../phone_agent/.env.local")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def importtime(code: str, env: dict) -> list[tuple[int, int, int, str]]:
+    """(self us, cumulative us, depth, module) for every import `code` does."""
+    result = subprocess.run(  # nosec
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            imports.append((int(own), int(cumulative), len(indent) // 2, module))
+    return imports
+
+
+def measure(module: str, env: dict) -> tuple[float, dict[str, float]]:
+    """Import time of `module` in ms, and its self time per top-level package."""
+    baseline = {name for _, _, _, name in importtime("pass", env)}
+    imports = importtime(f"import {module}", env)
+
+    total = sum(
+        cumulative
+        for _, cumulative, depth, name in imports
+        if depth == 0 and name not in baseline
+    )
+    packages = defaultdict(float)
+    for own, _, _, name in imports:
+        if name not in baseline:
+            parts = name.split(".")
+            package = ".".join(parts[:2]) if parts[0] == "google" else parts[0]
+            packages[package] += own / 1000
+    return total / 1000, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="phone_agent.agent")
+    parser.add_argument("--budget-ms", type=float, default=2500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    # The settings the agent reads at import, without a phone attached
+    env = {
+        **{k: v for k, v in dotenv_values(ENV_FILE).items() if v is not None},
+        **os.environ,
+    }
+    env.setdefault("INPUT_BACKEND", "null")
+
+    totals, breakdowns = [], []
+    for _ in range(args.runs):
+        total, packages = measure(args.module, env)
+        totals.append(total)
+        breakdowns.append(packages)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs")
+    print(f"(min {min(totals):.0f} ms, max {max(totals):.0f} ms)\n")
+
+    names = set().union(*breakdowns)
+    per_package = {
+        name: statistics.median(packages.get(name, 0.0) for packages in breakdowns)
+        for name in names
+    }
+    print(f"{'package':<32}{'self ms':>10}")
+    for name, ms in sorted(per_package.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"{name:<32}{ms:>10.1f}")
+
+    if median > args.budget_ms:
+        print(f"\nOver budget: {median:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\nWithin budget of {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures how long `locate_UI_elements` waits for Gemini on a busy screen,
+with the whole response awaited versus streamed and cut off at the first box
+matching the query, against a fake client that generates box by box.
+
+    python -m benchmarks.streaming [--calls 40] [--elements 10] [--latency 0.4]
+        [--element-latency 0.15]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), "../phone_agent/.env.local"))
+
+from benchmarks.encoding import synthetic_frame  # noqa: E402
+from benchmarks.fakes import FakeGenaiClient  # noqa: E402
+from phone_agent.tools import vision  # noqa: E402
+from phone_agent.tools.gemini import gemini_client  # noqa: E402
+from phone_agent.tools.tracing import nearest_rank  # noqa: E402
+
+QUERIES = ["the settings icon", "the search field", "the send button"]
+
+
+async def run(calls: int) -> list[float]:
+    image = synthetic_frame()
+    timings = []
+    for i in range(calls):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        bounding_boxes = await vision.gemini_spatial_understanding(image, query)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert any(
+            vision.label_matches(box.get("label", ""), query) for box in bounding_boxes
+        ), bounding_boxes
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--elements", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--element-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    print(
+        f"{args.calls} calls, {args.elements} boxes per answer, {args.latency}s to "
+        f"the first token, {args.element_latency}s per box\n"
+    )
+    print(f"{'mode':<12}{'median ms':>11}{'p95 ms':>9}{'max ms':>9}")
+    for name, streaming in [("awaited", False), ("streamed", True)]:
+        vision.config["VISION_STREAMING"] = streaming
+        gemini_client.client = FakeGenaiClient(
+            latency=args.latency,
+            elements=args.elements,
+            element_latency=args.element_latency,
+            seed=0,
+        )
+        timings = asyncio.run(run(args.calls))
+        print(
+            f"{name:<12}{statistics.median(timings):>11.0f}"
+            f"{nearest_rank(timings, 0.95):>9.0f}{timings[-1]:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Measures what each VISION_ZOOM_MODE uploads and how long a lookup takes on a
+full resolution frame, against a fake client with a fixed latency per call.
+
+    python -m benchmarks.zoom [path/to/frames] [--calls 10] [--latency 0.3]
+
+Without frames a synthetic 1250x2674 frame is used, which compresses far
+better than a real screenshot, so look at the tokens rather than the bytes.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), "../phone_agent/.env.local"))
+
+from benchmarks.encoding import load_frames, synthetic_frame  # noqa: E402
+from benchmarks.fakes import FakeGenaiClient  # noqa: E402
+from phone_agent.tools import vision  # noqa: E402
+from phone_agent.tools.boxes import crop_region, tiles  # noqa: E402
+from phone_agent.tools.encoding import EncodingProfile, encode  # noqa: E402
+from phone_agent.tools.gemini import gemini_client  # noqa: E402
+from phone_agent.tools.encoding import image_tokens  # noqa: E402
+
+MODES = ["off", "refine", "tile"]
+
+
+def detail(image, mode: str) -> float:
+    """Size of an element in the final pass relative to the captured frame."""
+    if mode == "refine":
+        size = vision.config["VISION_ZOOM_MIN_SIZE"]
+        image = crop_region(image, [0, 0, size, size])
+    elif mode == "tile":
+        regions = tiles(
+            vision.config["VISION_TILE_ROWS"],
+            vision.config["VISION_TILE_COLS"],
+            vision.config["VISION_TILE_OVERLAP"],
+        )
+        image = crop_region(image, regions[0])
+    profile = vision.vision_profile
+    return min(
+        1.0,
+        (profile.max_width or image.width) / image.width,
+        (profile.max_height or image.height) / image.height,
+    )
+
+
+async def run(image, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        bounding_boxes = await vision.gemini_spatial_understanding(
+            image, f"the toggle {i}"
+        )
+        assert "box_2d" in bounding_boxes[0], bounding_boxes
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("frames", nargs="?")
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    image = load_frames(args.frames)[0] if args.frames else synthetic_frame(1250, 2674)
+    full, _ = encode(image, EncodingProfile(format=vision.vision_profile.format))
+    print(
+        f"{image.width}x{image.height} frame, {len(full) / 1024:.0f} KB and "
+        f"~{image_tokens(*image.size)} tokens at full resolution, "
+        f"{args.latency}s per call\n"
+    )
+    print(
+        f"{'mode':<10}{'calls':>7}{'detail':>8}{'KB/lookup':>11}"
+        f"{'tokens/lookup':>15}{'ms/lookup':>11}"
+    )
+    for mode in MODES:
+        vision.config["VISION_ZOOM_MODE"] = mode
+        fake = FakeGenaiClient(latency=args.latency, seed=0)
+        gemini_client.client = fake
+        ms = asyncio.run(run(image, args.calls))
+        print(
+            f"{mode:<10}{fake.models.calls / args.calls:>7.1f}"
+            f"{detail(image, mode):>8.2f}"
+            f"{fake.models.bytes / args.calls / 1024:>11.0f}"
+            f"{fake.models.image_tokens / args.calls:>15.0f}{ms:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
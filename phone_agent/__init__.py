@@ -1 +1,9 @@
-from . import agent
+import importlib
+
+
+def __getattr__(name: str):
+    # The agent pulls in ADK and the Gemini SDK, only load it when asked for
+    # (e.g. by `adk web`), not whenever a tool module is imported
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
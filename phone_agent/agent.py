@@ -1,9 +1,17 @@
 import os
 
-import jinja2
 from dotenv import load_dotenv
 from google.adk.agents import Agent, LoopAgent
+from google.adk.agents.readonly_context import ReadonlyContext
 
+from phone_agent.templates import prompt_registry
+from phone_agent.tools.composite import (
+    click_and_screenshot,
+    navigate_to,
+    remember_screen,
+    tap_at_coordinates,
+    tap_UI_element,
+)
 from phone_agent.tools.navigation import (
     click_pointer,
     enter_keys,
@@ -13,42 +21,72 @@ from phone_agent.tools.navigation import (
 )
 from phone_agent.tools.vision import (
     _load_screenshot,
+    locate_multiple_UI_elements,
     locate_UI_elements,
     take_screenshot,
 )
-from phone_agent.tools.loop import pause_loop, human_intervention
+from phone_agent.tools.context_cache import (
+    invalidate_context_cache,
+    use_context_cache,
+)
+from phone_agent.tools.loop import pause_loop, human_intervention, wait_until_settled
+from phone_agent.tools.ratelimit import limit_model_requests
+from phone_agent.tools.recorder import record_tool_call
+from phone_agent.tools.tracing import (
+    trace_after_agent,
+    trace_after_model,
+    trace_before_model,
+    traced,
+)
 
 load_dotenv()
 
-# Load prompt from Jinja template
-env = jinja2.Environment(
-    loader=jinja2.FileSystemLoader(os.path.dirname(__file__)),
-    autoescape=jinja2.select_autoescape(),
-)
-template = env.get_template("prompts/agent.j2")
-PROMPT_TEXT = template.render(
-    phone_password=os.getenv("PHONE_PASSWORD")
-)  # https://cookbook.openai.com/examples/gpt4-1_prompting_guide
+
+def agent_instruction(context: ReadonlyContext) -> str:
+    """The rendered agent prompt, re-read on change when PROMPTS_HOT_RELOAD is on."""
+    return prompt_registry.render(
+        "agent.j2", phone_password=os.getenv("PHONE_PASSWORD")
+    )  # https://cookbook.openai.com/examples/gpt4-1_prompting_guide
+
 
 phone_agent = Agent(
     name="iphone_agent",
     model=os.getenv("GEMINI_PRO_MODEL"),
-    instruction=PROMPT_TEXT,
+    instruction=agent_instruction,
     tools=[
-        home_screen,
-        move_pointer,
-        click_pointer,
-        scroll_screen,
-        enter_keys,
-        take_screenshot,
-        locate_UI_elements,
-        pause_loop,
-        human_intervention,
+        traced(tool)
+        for tool in [
+            home_screen,
+            move_pointer,
+            click_pointer,
+            tap_at_coordinates,
+            tap_UI_element,
+            click_and_screenshot,
+            navigate_to,
+            remember_screen,
+            scroll_screen,
+            enter_keys,
+            take_screenshot,
+            locate_UI_elements,
+            locate_multiple_UI_elements,
+            pause_loop,
+            wait_until_settled,
+            human_intervention,
+        ]
+    ],
+    before_model_callback=[
+        limit_model_requests,
+        # Before the screenshot callback, which starts timing the model call
+        use_context_cache,
+        trace_before_model(_load_screenshot),
     ],
-    before_model_callback=_load_screenshot,
+    after_model_callback=trace_after_model,
+    on_model_error_callback=invalidate_context_cache,
+    after_tool_callback=record_tool_call,
 )
 
 root_agent = LoopAgent(
     name="loop_agent",
     sub_agents=[phone_agent],
+    after_agent_callback=trace_after_agent,
 )
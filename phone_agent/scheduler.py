@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from phone_agent.agent import root_agent
+from phone_agent.tools.device import devices
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+config = {
+    # Sessions running at once, 0 for one per device
+    "MAX_SESSIONS": int(os.getenv("MAX_SESSIONS", "0")),
+}
+
+APP_NAME = "phone_agent"
+
+
+@dataclass(frozen=True)
+class Job:
+    """A task for the agent to carry out on one device."""
+
+    device: str
+    task: str
+
+
+async def run_session(runner: InMemoryRunner, job: Job, user_id: str) -> dict:
+    """Runs one agent session on the job's device until the loop ends."""
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id=user_id, state={"device": job.device}
+    )
+    message = types.Content(role="user", parts=[types.Part(text=job.task)])
+
+    start = time.monotonic()
+    result = {"device": job.device, "task": job.task, "session": session.id}
+    final_response = None
+    try:
+        async for event in runner.run_async(
+            user_id=user_id, session_id=session.id, new_message=message
+        ):
+            if event.content and event.content.parts and event.content.parts[0].text:
+                final_response = event.content.parts[0].text
+    except Exception as e:
+        logger.exception("Session %s on %s failed", session.id, job.device)
+        result.update(status="error", message=str(e))
+    else:
+        result.update(status="completed", final_response=final_response)
+
+    result["duration_s"] = round(time.monotonic() - start, 1)
+    return result
+
+
+async def run_sessions(
+    jobs: list[Job],
+    max_sessions: Optional[int] = None,
+    runner: Optional[InMemoryRunner] = None,
+    user_id: str = "scheduler",
+) -> list[dict]:
+    """
+    Runs the jobs concurrently, at most `max_sessions` at a time and one at a
+    time per device. All sessions share one runner, the Gemini request budget
+    and the mouse and keyboard. Results are returned in job order.
+    """
+    known = devices()
+    unknown = sorted({job.device for job in jobs} - known.keys())
+    if unknown:
+        raise KeyError(f"Unknown devices: {', '.join(unknown)}")
+
+    runner = runner or InMemoryRunner(agent=root_agent, app_name=APP_NAME)
+    max_sessions = max_sessions or config["MAX_SESSIONS"] or len(known)
+    sessions = asyncio.Semaphore(max_sessions)
+    device_locks = defaultdict(asyncio.Lock)
+
+    async def run(job: Job) -> dict:
+        async with device_locks[job.device], sessions:
+            return await run_session(runner, job, user_id)
+
+    return await asyncio.gather(*(run(job) for job in jobs))
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m phone_agent.scheduler jobs.json
+    # with jobs.json a list of {"device": "...", "task": "..."}
+    with open(sys.argv[1]) as f:
+        jobs = [Job(**job) for job in json.load(f)]
+    for result in asyncio.run(run_sessions(jobs)):
+        print(json.dumps(result))
@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+from typing import Optional
+
+import jinja2
+from dotenv import load_dotenv
+from google.genai import types
+from pydantic import ConfigDict
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+config = {
+    # Re-render prompts whose template file changed, for prompt development
+    "PROMPTS_HOT_RELOAD": os.getenv("PROMPTS_HOT_RELOAD", "false").lower() == "true",
+}
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
+
+
+class FrozenGenerateContentConfig(types.GenerateContentConfig):
+    """A GenerateContentConfig that raises on assignment, so it can be shared."""
+
+    model_config = ConfigDict(frozen=True)
+
+
+class PromptRegistry:
+    """
+    Compiles every prompt template once and keeps each rendering, and the
+    generation config built around it, per set of arguments. With hot reload
+    on, a template whose file changed is recompiled and what was built from
+    it is dropped on its next use.
+    """
+
+    def __init__(self, directory: str, hot_reload: bool = False):
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self._env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(directory),
+            autoescape=jinja2.select_autoescape(),
+            auto_reload=hot_reload,
+        )
+        self._lock = threading.Lock()
+        self._mtimes: dict[str, int] = {}
+        self._renders: dict[tuple, str] = {}
+        self._configs: dict[tuple, FrozenGenerateContentConfig] = {}
+
+    def _reload_if_changed(self, name: str) -> None:
+        mtime = os.stat(os.path.join(self.directory, name)).st_mtime_ns
+        if self._mtimes.setdefault(name, mtime) == mtime:
+            return
+        self._mtimes[name] = mtime
+        self._renders = {k: v for k, v in self._renders.items() if k[0] != name}
+        self._configs = {k: v for k, v in self._configs.items() if k[0] != name}
+        logger.info("Reloaded prompt %s", name)
+
+    def render(self, name: str, **context) -> str:
+        """The template rendered with `context`, whose values must be hashable."""
+        key = (name, tuple(sorted(context.items())))
+        with self._lock:
+            if self.hot_reload:
+                self._reload_if_changed(name)
+            text = self._renders.get(key)
+            if text is None:
+                text = self._env.get_template(name).render(**context)
+                self._renders[key] = text
+            return text
+
+    def generation_config(
+        self, name: str, context: Optional[dict] = None, **settings
+    ) -> FrozenGenerateContentConfig:
+        """
+        A shared config with the rendered template as system instruction and
+        `settings` as the remaining GenerateContentConfig fields. Derive a
+        variant with `model_copy(update=...)` instead of modifying it.
+
+        Configs are kept per template and context only, hashing the settings
+        would cost more than the lookup saves. Calls with the same context
+        must pass the same settings, put whatever tells them apart in the
+        context.
+        """
+        context = context or {}
+        key = (name, tuple(sorted(context.items())))
+        with self._lock:
+            if self.hot_reload:
+                self._reload_if_changed(name)
+            cached = self._configs.get(key)
+        if cached is not None:
+            return cached
+
+        generation_config = FrozenGenerateContentConfig(
+            system_instruction=self.render(name, **context), **settings
+        )
+        with self._lock:
+            return self._configs.setdefault(key, generation_config)
+
+
+prompt_registry = PromptRegistry(PROMPTS_DIR, hot_reload=config["PROMPTS_HOT_RELOAD"])
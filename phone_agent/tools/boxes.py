@@ -0,0 +1,177 @@
+from numbers import Real
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+# Gemini returns [y1 x1 y2 x2] on a 1000x1000 grid
+GRID = 1000
+
+
+def _valid(bounding_box) -> bool:
+    box = bounding_box.get("box_2d") if isinstance(bounding_box, dict) else None
+    return (
+        isinstance(box, (list, tuple))
+        and len(box) == 4
+        and all(isinstance(v, Real) and not isinstance(v, bool) for v in box)
+    )
+
+
+def to_array(bounding_boxes: list[dict]) -> np.ndarray:
+    """
+    The boxes as an (n, 4) array of [y1 x1 y2 x2], clipped to the grid and
+    with the corners ordered so y1 <= y2 and x1 <= x2.
+    """
+    boxes = np.array(
+        [bounding_box["box_2d"] for bounding_box in bounding_boxes], dtype=float
+    ).reshape(-1, 4)
+    boxes = np.clip(boxes, 0, GRID)
+    return np.concatenate(
+        [
+            np.minimum(boxes[:, :2], boxes[:, 2:]),
+            np.maximum(boxes[:, :2], boxes[:, 2:]),
+        ],
+        axis=1,
+    )
+
+
+def iou_matrix(boxes: np.ndarray) -> np.ndarray:
+    """Intersection over union of every pair of [y1 x1 y2 x2] boxes."""
+    top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    union = areas[:, None] + areas[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def non_max_suppression(
+    boxes: np.ndarray, threshold: float, groups: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Indices of the boxes to keep. Gemini lists the best match first, so a box
+    is dropped when it overlaps an earlier kept box of the same group by more
+    than `threshold`.
+    """
+    overlaps = iou_matrix(boxes) > threshold
+    if groups is not None:
+        overlaps &= groups[:, None] == groups[None, :]
+
+    keep = np.ones(len(boxes), dtype=bool)
+    for i in range(len(boxes)):
+        if keep[i]:
+            # Only later boxes can be suppressed by this one
+            keep[i + 1 :] &= ~overlaps[i, i + 1 :]
+    return np.flatnonzero(keep)
+
+
+def clean_boxes(
+    bounding_boxes: list[dict], threshold: float, group: Optional[str] = None
+) -> tuple[list[dict], int]:
+    """
+    Drops malformed entries and duplicate boxes, and writes the clipped and
+    ordered coordinates back. Boxes are only compared with boxes that have
+    the same `group` field, e.g. the query they answer. Returns the boxes and
+    the number of duplicates dropped.
+    """
+    bounding_boxes = [
+        bounding_box for bounding_box in bounding_boxes if _valid(bounding_box)
+    ]
+    if not bounding_boxes:
+        return [], 0
+
+    boxes = to_array(bounding_boxes)
+    groups = (
+        np.array([str(bounding_box.get(group)) for bounding_box in bounding_boxes])
+        if group
+        else None
+    )
+    keep = non_max_suppression(boxes, threshold, groups)
+
+    cleaned = []
+    for i in keep:
+        bounding_box = dict(bounding_boxes[i])
+        bounding_box["box_2d"] = np.rint(boxes[i]).astype(int).tolist()
+        cleaned.append(bounding_box)
+    return cleaned, len(bounding_boxes) - len(keep)
+
+
+def to_pixels(bounding_boxes: list[dict], width: int, height: int) -> np.ndarray:
+    """The boxes as (n, 4) integer [x1 y1 x2 y2] pixels of a width x height image."""
+    boxes = to_array(bounding_boxes)
+    scale = np.array([height, width, height, width]) / GRID
+    return (boxes * scale).astype(int)[:, [1, 0, 3, 2]]
+
+
+def to_screen(bounding_boxes: list[dict], x_bound: int, y_bound: int) -> np.ndarray:
+    """
+    The centers of the boxes as (n, 2) integer (x, y) tool coordinates, with
+    y measured from the bottom of the screen.
+    """
+    boxes = to_array(bounding_boxes)
+    xs = (boxes[:, [1, 3]] / GRID * x_bound).astype(int)
+    ys = ((GRID - boxes[:, [0, 2]]) / GRID * y_bound).astype(int)
+    return np.stack([xs.sum(axis=1) // 2, ys.sum(axis=1) // 2], axis=1)
+
+
+def region_around(
+    bounding_boxes: list[dict], margin: float, min_size: float
+) -> list[float]:
+    """
+    A [y1 x1 y2 x2] grid region covering the boxes plus `margin` on every
+    side, at least `min_size` high and wide, and shifted to lie on the grid.
+    """
+    boxes = to_array(bounding_boxes)
+    low = boxes[:, :2].min(axis=0) - margin
+    high = boxes[:, 2:].max(axis=0) + margin
+    center = (low + high) / 2
+    half = np.minimum(np.maximum((high - low) / 2, min_size / 2), GRID / 2)
+    low, high = center - half, center + half
+    shift = np.clip(-low, 0, None) - np.clip(high - GRID, 0, None)
+    return [*(low + shift).tolist(), *(high + shift).tolist()]
+
+
+def tiles(rows: int, cols: int, overlap: float = 0.0) -> list[list[float]]:
+    """
+    Grid regions of a rows x cols tiling, each grown by `overlap` of its size
+    so elements on a seam are whole in at least one tile.
+    """
+    height, width = GRID / rows, GRID / cols
+    pad_y, pad_x = height * overlap / 2, width * overlap / 2
+    return [
+        [
+            max(0.0, row * height - pad_y),
+            max(0.0, col * width - pad_x),
+            min(float(GRID), (row + 1) * height + pad_y),
+            min(float(GRID), (col + 1) * width + pad_x),
+        ]
+        for row in range(rows)
+        for col in range(cols)
+    ]
+
+
+def crop_region(image: Image.Image, region: list[float]) -> Image.Image:
+    """The part of the image inside a [y1 x1 y2 x2] grid region."""
+    width, height = image.size
+    y1, x1, y2, x2 = region
+    return image.crop(
+        (
+            round(x1 / GRID * width),
+            round(y1 / GRID * height),
+            round(x2 / GRID * width),
+            round(y2 / GRID * height),
+        )
+    )
+
+
+def from_region(bounding_boxes: list[dict], region: list[float]) -> list[dict]:
+    """Maps boxes on the grid of a cropped region back onto the whole frame."""
+    boxes = to_array(bounding_boxes)
+    y1, x1, y2, x2 = region
+    scale = np.array([y2 - y1, x2 - x1, y2 - y1, x2 - x1]) / GRID
+    offset = np.array([y1, x1, y1, x1])
+    mapped = np.rint(boxes * scale + offset).astype(int).tolist()
+    return [
+        {**bounding_box, "box_2d": box}
+        for bounding_box, box in zip(bounding_boxes, mapped)
+    ]
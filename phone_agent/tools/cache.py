@@ -0,0 +1,128 @@
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+config = {
+    "LOCATE_CACHE_SIZE": int(os.getenv("LOCATE_CACHE_SIZE", "256")),
+    "LOCATE_CACHE_TTL": float(os.getenv("LOCATE_CACHE_TTL", "600")),
+    "LOCATE_CACHE_PATH": os.getenv("LOCATE_CACHE_PATH"),
+}
+
+_ARTICLES = re.compile(r"^(the|a|an)\s+")
+_PUNCTUATION = re.compile(r"[\"'`.,;:!?]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Maps trivially different phrasings of a query onto the same key."""
+    query = _PUNCTUATION.sub(" ", query.lower())
+    query = _WHITESPACE.sub(" ", query).strip()
+    return _ARTICLES.sub("", query)
+
+
+class LocateCache:
+    """
+    Bounded LRU cache with a TTL for `locate_UI_elements` results, keyed by
+    (frame fingerprint, normalized query). When a path is given the entries
+    are also persisted as JSON so they survive restarts.
+    """
+
+    def __init__(
+        self, max_entries: int = 256, ttl: float = 600, path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, list[dict]]] = OrderedDict()
+        if path:
+            self._load()
+
+    @staticmethod
+    def key(fingerprint: str, query: str) -> str:
+        return f"{fingerprint}:{normalize_query(query)}"
+
+    def get(self, fingerprint: str, query: str) -> Optional[list[dict]]:
+        key = self.key(fingerprint, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, bounding_boxes = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers mutate the boxes, so never hand out the cached ones
+            return copy.deepcopy(bounding_boxes)
+
+    def put(self, fingerprint: str, query: str, bounding_boxes: list[dict]) -> None:
+        key = self.key(fingerprint, query)
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(bounding_boxes))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if self.path:
+                self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        now = time.time()
+        for key, stored_at, bounding_boxes in entries[-self.max_entries :]:
+            if now - stored_at <= self.ttl:
+                self._entries[key] = (stored_at, bounding_boxes)
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        entries = [[key, *entry] for key, entry in self._entries.items()]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+
+locate_cache = LocateCache(
+    max_entries=config["LOCATE_CACHE_SIZE"],
+    ttl=config["LOCATE_CACHE_TTL"],
+    path=config["LOCATE_CACHE_PATH"],
+)
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import subprocess  # nosec
+import tempfile
+import threading
+from typing import Optional
+
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+
+config = {
+    "CAPTURE_BACKEND": os.getenv("CAPTURE_BACKEND", "screencapture"),
+    "CAPTURE_SCALE": float(os.getenv("CAPTURE_SCALE", "1")),
+    "CAPTURE_REPLAY_DIR": os.getenv("CAPTURE_REPLAY_DIR"),
+    "CAPTURE_REPLAY_LOOP": os.getenv("CAPTURE_REPLAY_LOOP", "true").lower() == "true",
+}
+
+Box = tuple[int, int, int, int]
+
+
+class CaptureError(Exception):
+    """Raised when a backend fails to grab the screen."""
+
+
+class CaptureBackend:
+    """Grabs the (left, top, right, bottom) region of the mirrored phone."""
+
+    name = "base"
+
+    def grab(self, box: Box) -> Image.Image:
+        raise NotImplementedError
+
+    async def agrab(self, box: Box) -> Image.Image:
+        """Grabs without blocking the event loop, in a worker thread by default."""
+        return await asyncio.to_thread(self.grab, box)
+
+    def grab_preview(self, box: Box) -> Image.Image:
+        """
+        Grabs the region at whatever resolution is cheapest, for change
+        detection. Defaults to a regular grab.
+        """
+        return self.grab(box)
+
+    async def agrab_preview(self, box: Box) -> Image.Image:
+        return await asyncio.to_thread(self.grab_preview, box)
+
+    def close(self) -> None:
+        pass
+
+
+class ScreencaptureBackend(CaptureBackend):
+    """Spawns macOS `screencapture` for every frame and crops the full desktop."""
+
+    name = "screencapture"
+
+    def grab(self, box: Box) -> Image.Image:
+        # screencapture can only write to a file, so it gets a throwaway one
+        fd, capture_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+
+        try:
+            subprocess.run(  # nosec
+                ["screencapture", "-C", capture_path],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            return self._crop(capture_path, box)
+        except subprocess.CalledProcessError as e:
+            raise CaptureError(str(e)) from e
+        except FileNotFoundError as e:
+            raise CaptureError(
+                f"'screencapture' command not found. Ensure you are on macOS. {e}"
+            ) from e
+        finally:
+            os.remove(capture_path)
+
+    async def agrab(self, box: Box) -> Image.Image:
+        fd, capture_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+
+        try:
+            try:
+                process = await asyncio.create_subprocess_exec(  # nosec
+                    "screencapture",
+                    "-C",
+                    capture_path,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except FileNotFoundError as e:
+                raise CaptureError(
+                    f"'screencapture' command not found. Ensure you are on macOS. {e}"
+                ) from e
+
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise CaptureError(
+                    f"screencapture exited with {process.returncode}: "
+                    f"{stderr.decode().strip()}"
+                )
+            return await asyncio.to_thread(self._crop, capture_path, box)
+        finally:
+            os.remove(capture_path)
+
+    @staticmethod
+    def _crop(path: str, box: Box) -> Image.Image:
+        with Image.open(path) as img:
+            return img.crop(box)
+
+
+class MSSBackend(CaptureBackend):
+    """
+    Keeps an in-process capture handle open and grabs only the crop region.
+
+    Regions are given in screenshot pixels like IMAGE_CROP_BOX. On HiDPI
+    displays the OS expects logical points, so set CAPTURE_SCALE to the
+    display scale factor (2 on Retina).
+    """
+
+    name = "mss"
+
+    def __init__(self, scale: float = 1.0):
+        try:
+            import mss
+        except ImportError as e:
+            raise CaptureError(
+                "The 'mss' capture backend requires the optional 'mss' package: "
+                "uv sync --extra capture"
+            ) from e
+
+        self._mss = mss
+        self._scale = scale
+        # mss handles are not shareable across threads on every platform
+        self._local = threading.local()
+
+    def _handle(self):
+        if not hasattr(self._local, "sct"):
+            self._local.sct = self._mss.mss()
+        return self._local.sct
+
+    def grab(self, box: Box) -> Image.Image:
+        img = self.grab_preview(box)
+        left, top, right, bottom = box
+        size = (right - left, bottom - top)
+        if img.size != size:
+            img = img.resize(size, Image.Resampling.BILINEAR)
+        return img
+
+    def grab_preview(self, box: Box) -> Image.Image:
+        """Grabs at the OS resolution without scaling back to screenshot pixels."""
+        left, top, right, bottom = box
+        region = {
+            "left": round(left / self._scale),
+            "top": round(top / self._scale),
+            "width": round((right - left) / self._scale),
+            "height": round((bottom - top) / self._scale),
+        }
+        try:
+            shot = self._handle().grab(region)
+        except self._mss.exception.ScreenShotError as e:
+            raise CaptureError(str(e)) from e
+
+        return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def close(self) -> None:
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            del self._local.sct
+
+
+class ReplayBackend(CaptureBackend):
+    """
+    Serves recorded frames from a directory in file name order, so the agent
+    can run without a phone. Full-desktop recordings are cropped to the box,
+    frames that are already cropped are returned as they are.
+    """
+
+    name = "replay"
+
+    extensions = (".png", ".jpg", ".jpeg", ".webp")
+
+    def __init__(self, directory: str, loop: bool = True):
+        if not directory or not os.path.isdir(directory):
+            raise CaptureError(f"Replay directory not found: {directory}")
+
+        self._paths = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.lower().endswith(self.extensions)
+        )
+        if not self._paths:
+            raise CaptureError(f"No frames to replay in {directory}")
+
+        self._loop = loop
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def grab(self, box: Box) -> Image.Image:
+        with self._lock:
+            path = self._paths[self._index]
+            if self._index + 1 < len(self._paths):
+                self._index += 1
+            elif self._loop:
+                self._index = 0
+        return self._load(path, box)
+
+    def grab_preview(self, box: Box) -> Image.Image:
+        """
+        The frame the next grab returns, without moving on to it. Polling for
+        change detection would otherwise use up the recording and never see
+        the same frame twice.
+        """
+        with self._lock:
+            path = self._paths[self._index]
+        return self._load(path, box)
+
+    def _load(self, path: str, box: Box) -> Image.Image:
+        with Image.open(path) as img:
+            img.load()
+            width, height = img.size
+            left, top, right, bottom = box
+            # Recordings of the whole desktop are cropped, already cropped
+            # frames are used as they are
+            cropped = (width, height) == (right - left, bottom - top)
+            if right <= width and bottom <= height and not cropped:
+                return img.crop(box)
+            return img.convert("RGB")
+
+
+_backend: Optional[CaptureBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str) -> CaptureBackend:
+    """Builds the capture backend registered under `name`."""
+    if name == ScreencaptureBackend.name:
+        return ScreencaptureBackend()
+    if name == MSSBackend.name:
+        return MSSBackend(scale=config["CAPTURE_SCALE"])
+    if name == ReplayBackend.name:
+        return ReplayBackend(
+            config["CAPTURE_REPLAY_DIR"], loop=config["CAPTURE_REPLAY_LOOP"]
+        )
+    raise CaptureError(f"Unknown capture backend: {name}")
+
+
+def get_backend() -> CaptureBackend:
+    """Returns the process-wide backend selected by CAPTURE_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(config["CAPTURE_BACKEND"])
+        return _backend
+
+
+def set_backend(backend: CaptureBackend) -> None:
+    """Replaces the process-wide backend, e.g. with a replay for benchmarks."""
+    global _backend
+    with _backend_lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
@@ -0,0 +1,207 @@
+import asyncio
+from typing import Optional
+
+from google.adk.tools import ToolContext
+
+from phone_agent.tools.device import get_device
+from phone_agent.tools.memory import navigation_memory
+from phone_agent.tools.navigation import (
+    click_pointer,
+    home_screen,
+    move_pointer,
+    scroll_screen,
+)
+from phone_agent.tools.vision import locate_UI_elements, take_screenshot
+
+# Tools whose recorded calls `navigate_to` may replay
+_REPLAYABLE = {
+    "home_screen": home_screen,
+    "move_pointer": move_pointer,
+    "click_pointer": click_pointer,
+    "scroll_screen": scroll_screen,
+}
+
+
+def _with_screenshot(outcome: dict, screenshot: dict) -> dict:
+    """
+    Adds the status of the screenshot taken last, which the model is sent
+    along with the response, keeping the outcome's own message.
+    """
+    return {
+        **({"message": screenshot["message"]} if "message" in screenshot else {}),
+        **outcome,
+        "screenshot": screenshot["status"],
+    }
+
+
+async def _screenshot_after(
+    action: dict, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """Takes the post-action screenshot and merges both outcomes."""
+    screenshot = await take_screenshot(explanation="", tool_context=tool_context)
+    return _with_screenshot(action, screenshot)
+
+
+async def tap_at_coordinates(
+    explanation: str, x: int, y: int, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Moves the touch pointer to (x, y), clicks, and takes a screenshot of the
+    result, all in one step. Coordinates must be obtained first using the
+    `locate_UI_elements` tool. Do not guess coordinates.
+
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+        x (int): The target x-coordinate for the tap.
+        y (int): The target y-coordinate for the tap.
+
+    Returns:
+        dict: The outcome of the tap and the status of the new screenshot.
+    """
+    moved = await move_pointer(explanation, x, y, tool_context)
+    if moved["status"] == "error":
+        return moved
+
+    clicked = await click_pointer(explanation, tool_context)
+    return await _screenshot_after({**clicked, "x": x, "y": y}, tool_context)
+
+
+async def tap_UI_element(
+    explanation: str, query: str, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Locates a single UI element on the latest screenshot, taps it, and takes a
+    screenshot of the result, all in one step. Use it when the query clearly
+    identifies one element. When several elements match, nothing is tapped and
+    their coordinates are returned so you can pick one with `tap_at_coordinates`.
+
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+        query (str): A natural language description of the one UI element to
+          tap (e.g., 'the settings icon', 'button containing Send').
+
+    Returns:
+        dict: The outcome of the tap and the status of the new screenshot.
+    """
+    located = await locate_UI_elements(explanation, query, tool_context)
+    if "coordinates" not in located:
+        return located
+
+    coordinates = located["coordinates"]
+    if len(coordinates) > 1:
+        return {
+            "status": "ambiguous",
+            "message": "Several elements match, nothing was tapped.",
+            "coordinates": coordinates,
+        }
+
+    element = coordinates[0]
+    tapped = await tap_at_coordinates(
+        explanation, element["x"], element["y"], tool_context
+    )
+    if "label" in element:
+        tapped["label"] = element["label"]
+    return tapped
+
+
+async def click_and_screenshot(
+    explanation: str, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Clicks at the current touch pointer location, waits for the UI to update,
+    and takes a screenshot of the result, all in one step. Ensure the pointer is
+    correctly positioned using `move_pointer` before calling this.
+
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+
+    Returns:
+        dict: The outcome of the click and the status of the new screenshot.
+    """
+    clicked = await click_pointer(explanation, tool_context)
+    return await _screenshot_after(clicked, tool_context)
+
+
+async def remember_screen(
+    explanation: str, label: str, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Remembers the screen on the latest screenshot under a short label, so it
+    can be reached again with `navigate_to`. Only label a screen after
+    verifying it with a screenshot, and reuse labels for the same screen.
+
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+        label (str): A short name for the screen (e.g., 'settings', 'wi-fi settings').
+
+    Returns:
+        dict: The outcome of remembering the screen.
+    """
+    frame = get_device(tool_context).frame_store.latest()
+    if frame is None:
+        return {"status": "error", "message": "Take a screenshot first."}
+
+    # Persisting the graph writes to disk
+    await asyncio.to_thread(navigation_memory.label, frame.fingerprint, label)
+    return {"status": "screen remembered", "label": label}
+
+
+async def navigate_to(
+    explanation: str, label: str, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Navigates to a screen remembered with `remember_screen` by replaying the
+    actions that led there before, checking the screen after every step.
+    Try it before navigating to a remembered screen yourself. When the screen
+    does not match the remembered path, it stops and you continue from the
+    current screen.
+
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+        label (str): The label the screen was remembered under.
+
+    Returns:
+        dict: The outcome of the navigation and the status of the new screenshot.
+    """
+    device = get_device(tool_context)
+    screenshot = await take_screenshot(explanation="", tool_context=tool_context)
+    if screenshot["status"] == "error":
+        return screenshot
+
+    path = navigation_memory.path_to(device.frame_store.latest().fingerprint, label)
+    if path is None:
+        return _with_screenshot(
+            {
+                "status": "unknown screen",
+                "message": f"No known path to '{label}', navigate there yourself.",
+                "remembered_screens": navigation_memory.labels(),
+            },
+            screenshot,
+        )
+
+    for step, (actions, expected) in enumerate(path, 1):
+        for action in actions:
+            arguments = dict(action)
+            tool = _REPLAYABLE[arguments.pop("action")]
+            outcome = await tool(explanation, **arguments, tool_context=tool_context)
+            if outcome["status"] == "error":
+                return outcome
+
+        screenshot = await take_screenshot(explanation="", tool_context=tool_context)
+        if screenshot["status"] == "error":
+            return screenshot
+        if not navigation_memory.matches(
+            device.frame_store.latest().fingerprint, expected
+        ):
+            return _with_screenshot(
+                {
+                    "status": "path diverged",
+                    "message": f"After step {step} of {len(path)} the screen did "
+                    "not match the remembered path. Continue from the current screen.",
+                },
+                screenshot,
+            )
+
+    return _with_screenshot(
+        {"status": "arrived", "label": label, "steps": len(path)}, screenshot
+    )
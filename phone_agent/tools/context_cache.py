@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+from google.genai import errors, types
+
+from phone_agent.tools.gemini import GeminiClient, gemini_client
+from phone_agent.tools.tracing import span
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+config = {
+    "CONTEXT_CACHE": os.getenv("CONTEXT_CACHE", "false").lower() == "true",
+    # Seconds a cache lives after its last refresh
+    "CONTEXT_CACHE_TTL": int(os.getenv("CONTEXT_CACHE_TTL", "3600")),
+    # Seconds before asking again for a prompt the service refused to cache
+    "CONTEXT_CACHE_RETRY_AFTER": float(os.getenv("CONTEXT_CACHE_RETRY_AFTER", "600")),
+}
+
+
+@dataclass
+class CacheEntry:
+    name: str
+    model: str
+    expires: float
+    last_used: float
+
+
+def cache_missing(error: Exception) -> bool:
+    """
+    Whether a request failed because the service no longer knows its cache,
+    e.g. after it expired. Rate limits and other errors leave the cache as is.
+    """
+    if not isinstance(error, errors.APIError):
+        return False
+    return (
+        error.code == 404
+        or error.status == "NOT_FOUND"
+        or "cachedcontent" in (error.message or "").lower()
+    )
+
+
+def cache_key(model: str, generation_config: types.GenerateContentConfig) -> str:
+    """A hash of the model and the cacheable part of the config."""
+    cacheable = generation_config.model_dump(
+        mode="json",
+        include={"system_instruction", "tools", "tool_config"},
+        exclude_none=True,
+    )
+    payload = json.dumps([model, cacheable], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ContextCacheManager:
+    """
+    Keeps the static part of requests, the system instruction and the tool
+    declarations, in Gemini's context cache so it is not sent and billed in
+    full on every call. A cache is created the first time a prompt is used
+    and its TTL is extended in the background while it keeps being used.
+    When the service refuses a prompt, e.g. because it is shorter than the
+    minimum cacheable size, or caching fails in any other way, requests go
+    out uncached and the prompt is only tried again after `retry_after`.
+    """
+
+    def __init__(
+        self,
+        client: GeminiClient,
+        enabled: bool = True,
+        ttl: int = 3600,
+        retry_after: float = 600.0,
+    ):
+        self.client = client
+        self.enabled = enabled
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._entries: dict[str, CacheEntry] = {}
+        self._refused: dict[str, float] = {}
+        self._creating: dict[str, asyncio.Task] = {}
+        self._refresher: Optional[asyncio.Task] = None
+        self.metrics = {"created": 0, "refreshed": 0, "refused": 0, "hits": 0}
+
+    def _usable(self, entry: Optional[CacheEntry], now: float) -> bool:
+        # Leave a margin, so a cache does not expire while a request is out
+        return entry is not None and entry.expires - now > self.ttl / 10
+
+    async def get(
+        self, model: str, generation_config: types.GenerateContentConfig
+    ) -> Optional[str]:
+        """The name of the cache holding this config's prompt, None if uncached."""
+        if not self.enabled or not (
+            generation_config.system_instruction or generation_config.tools
+        ):
+            return None
+        key = cache_key(model, generation_config)
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if self._usable(entry, now):
+            entry.last_used = now
+            self.metrics["hits"] += 1
+            return entry.name
+        if now - self._refused.get(key, -self.retry_after) < self.retry_after:
+            return None
+
+        loop = asyncio.get_running_loop()
+        task = self._creating.get(key)
+        # Concurrent sessions wait for the same cache instead of each creating one
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(self._create(key, model, generation_config))
+            self._creating[key] = task
+            task.add_done_callback(lambda _: self._creating.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _create(
+        self, key: str, model: str, generation_config: types.GenerateContentConfig
+    ) -> Optional[str]:
+        with span("context_cache.create", model=model) as create:
+            try:
+                await self.client.ensure_client()
+                cached = await self.client.client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=generation_config.system_instruction,
+                        tools=generation_config.tools,
+                        tool_config=generation_config.tool_config,
+                        ttl=f"{self.ttl}s",
+                        display_name=f"phone_agent-{key[:12]}",
+                    ),
+                )
+            except Exception as e:
+                self._refused[key] = time.time()
+                self.metrics["refused"] += 1
+                create.attributes["refused"] = True
+                logger.warning(
+                    "Context cache unavailable for %s, sending prompts uncached: %s",
+                    model,
+                    e,
+                )
+                return None
+
+        now = time.time()
+        self._entries[key] = CacheEntry(
+            name=cached.name, model=model, expires=now + self.ttl, last_used=now
+        )
+        self._refused.pop(key, None)
+        self.metrics["created"] += 1
+        self._start_refresher()
+        return cached.name
+
+    async def apply(
+        self, model: str, generation_config: types.GenerateContentConfig
+    ) -> types.GenerateContentConfig:
+        """
+        The config referencing the cache instead of carrying the prompt, or
+        the config itself when it is not cached.
+        """
+        name = await self.get(model, generation_config)
+        if name is None:
+            return generation_config
+        return generation_config.model_copy(
+            update={
+                "cached_content": name,
+                "system_instruction": None,
+                "tools": None,
+                "tool_config": None,
+            }
+        )
+
+    def invalidate(self, name: Optional[str]) -> None:
+        """Stops using a cache, e.g. after the service no longer knew it."""
+        for key, entry in list(self._entries.items()):
+            if entry.name == name:
+                del self._entries[key]
+
+    def _start_refresher(self) -> None:
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        """
+        Extends the TTL of the caches once half of it is used up, as long as
+        they were used since their last refresh. Caches no longer used are
+        left to expire on the server.
+        """
+        while self._entries:
+            await asyncio.sleep(max(1.0, self.ttl / 4))
+            now = time.time()
+            for key, entry in list(self._entries.items()):
+                if entry.expires - now > self.ttl / 2:
+                    continue
+                if entry.last_used < entry.expires - self.ttl or not self._usable(
+                    entry, now
+                ):
+                    del self._entries[key]
+                    continue
+                try:
+                    with span("context_cache.refresh", model=entry.model):
+                        await self.client.client.aio.caches.update(
+                            name=entry.name,
+                            config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"),
+                        )
+                    entry.expires = now + self.ttl
+                    self.metrics["refreshed"] += 1
+                except Exception as e:
+                    logger.warning(
+                        "Failed to refresh context cache %s: %s", entry.name, e
+                    )
+                    del self._entries[key]
+
+
+async def use_context_cache(callback_context, llm_request) -> None:
+    """
+    Before-model callback that replaces the agent's instruction and tool
+    declarations with a reference to their context cache.
+    """
+    if not context_cache.enabled or llm_request.config is None:
+        return None
+    name = await context_cache.get(llm_request.model, llm_request.config)
+    if name:
+        # The config is built per request, so it can be changed in place
+        llm_request.config.cached_content = name
+        llm_request.config.system_instruction = None
+        llm_request.config.tools = None
+        llm_request.config.tool_config = None
+    return None
+
+
+def invalidate_context_cache(callback_context, llm_request, error) -> None:
+    """
+    Model error callback that stops using the cache the request referenced
+    when the service no longer knows it.
+    """
+    if (
+        llm_request.config is not None
+        and llm_request.config.cached_content
+        and cache_missing(error)
+    ):
+        context_cache.invalidate(llm_request.config.cached_content)
+    return None
+
+
+context_cache = ContextCacheManager(
+    gemini_client,
+    enabled=config["CONTEXT_CACHE"],
+    ttl=config["CONTEXT_CACHE_TTL"],
+    retry_after=config["CONTEXT_CACHE_RETRY_AFTER"],
+)
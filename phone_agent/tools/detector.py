@@ -0,0 +1,280 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from PIL import Image
+
+from phone_agent.tools.cache import normalize_query
+
+load_dotenv()
+
+config = {
+    "LOCAL_DETECTOR": os.getenv("LOCAL_DETECTOR", "false").lower() == "true",
+    "TEMPLATE_LIBRARY_DIR": os.getenv(
+        "TEMPLATE_LIBRARY_DIR", "phone_agent/data/templates"
+    ),
+    # Frames and templates are downscaled by this factor before matching
+    "DETECTOR_SCALE": float(os.getenv("DETECTOR_SCALE", "0.5")),
+    # Normalized cross-correlation a match needs to skip Gemini
+    "DETECTOR_MIN_SCORE": float(os.getenv("DETECTOR_MIN_SCORE", "0.92")),
+}
+
+# Template files are named after their label, variants after a double underscore
+# e.g. settings_icon.png and settings_icon__dark.png are both "settings icon"
+_VARIANT = re.compile(r"__.*$")
+
+
+@dataclass(frozen=True, eq=False)
+class Template:
+    label: str
+    pixels: np.ndarray
+    text: bool
+
+
+def _grayscale(image: Image.Image, scale: float) -> np.ndarray:
+    gray = image.convert("L")
+    if scale != 1:
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        gray = gray.resize(size, Image.Resampling.BILINEAR)
+    return np.asarray(gray, dtype=np.float64)
+
+
+def _window_sums(values: np.ndarray, h: int, w: int) -> np.ndarray:
+    """Sums of every h x w window, via an integral image."""
+    integral = np.pad(values.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+def match_template(image: np.ndarray, template: np.ndarray) -> tuple[float, int, int]:
+    """
+    Normalized cross-correlation of a template over a grayscale image, computed
+    with FFTs. Returns the best score and the top-left corner where it occurs.
+    """
+    h, w = template.shape
+    height, width = image.shape
+    if h > height or w > width:
+        return -1.0, 0, 0
+
+    t = template - template.mean()
+    t_norm = np.sqrt((t**2).sum())
+    if t_norm == 0:
+        return -1.0, 0, 0
+
+    shape = (height + h - 1, width + w - 1)
+    correlation = np.fft.irfft2(
+        np.fft.rfft2(image, shape) * np.fft.rfft2(t[::-1, ::-1], shape), shape
+    )[h - 1 : height, w - 1 : width]
+
+    n = h * w
+    sums = _window_sums(image, h, w)
+    variance = _window_sums(image**2, h, w) - sums**2 / n
+    denominator = np.sqrt(np.maximum(variance, 0)) * t_norm
+    scores = np.where(
+        denominator > 1e-6, correlation / np.maximum(denominator, 1e-6), 0
+    )
+
+    y, x = np.unravel_index(np.argmax(scores), scores.shape)
+    return float(scores[y, x]), int(y), int(x)
+
+
+def find_text_regions(
+    gray: np.ndarray,
+    edge_threshold: float = 40,
+    min_row_edges: int = 3,
+    min_height: int = 4,
+    max_height: int = 60,
+    word_gap: int = 6,
+) -> list[tuple[int, int, int, int]]:
+    """
+    OCR-free text line detection. Text shows up as rows packed with strong
+    horizontal intensity changes on a flat UI background. Those rows are grouped
+    into bands and each band is split into runs of columns with edges.
+
+    Returns (top, left, bottom, right) boxes in pixel coordinates of `gray`.
+    """
+    edges = np.abs(np.diff(gray, axis=1)) > edge_threshold
+    active_rows = edges.sum(axis=1) >= min_row_edges
+
+    regions = []
+    row = 0
+    while row < len(active_rows):
+        if not active_rows[row]:
+            row += 1
+            continue
+        top = row
+        while row < len(active_rows) and active_rows[row]:
+            row += 1
+        bottom = row
+        if not min_height <= bottom - top <= max_height:
+            continue
+
+        # Dilate column activity so letters and words merge into one run
+        columns = edges[top:bottom].any(axis=0).astype(np.int32)
+        columns = np.convolve(columns, np.ones(word_gap, dtype=np.int32), "same") > 0
+        col = 0
+        while col < len(columns):
+            if not columns[col]:
+                col += 1
+                continue
+            left = col
+            while col < len(columns) and columns[col]:
+                col += 1
+            regions.append((top, left, bottom, col + 1))
+    return regions
+
+
+class LocalDetector:
+    """
+    CPU-only first tier for `locate_UI_elements`. Matches a library of saved
+    crops against the frame and returns boxes in Gemini's {"label", "box_2d"}
+    shape, or None when nothing matches confidently enough.
+
+    Crops in the `text` subdirectory of the library are rendered labels. They
+    are only searched for inside detected text regions, which is faster and
+    avoids matching them on icons.
+    """
+
+    def __init__(self, directory: str, scale: float = 0.5, min_score: float = 0.92):
+        self.directory = directory
+        self.scale = scale
+        self.min_score = min_score
+        self._templates: Optional[list[Template]] = None
+        self._lock = threading.Lock()
+
+    def templates(self) -> list[Template]:
+        with self._lock:
+            if self._templates is None:
+                self._templates = self._load()
+            return self._templates
+
+    def reload(self) -> None:
+        with self._lock:
+            self._templates = None
+
+    def _load(self) -> list[Template]:
+        templates = []
+        for subdirectory, text in (
+            (self.directory, False),
+            (os.path.join(self.directory, "text"), True),
+        ):
+            if not os.path.isdir(subdirectory):
+                continue
+            for name in sorted(os.listdir(subdirectory)):
+                stem, extension = os.path.splitext(name)
+                if extension.lower() not in (".png", ".jpg", ".jpeg"):
+                    continue
+                with Image.open(os.path.join(subdirectory, name)) as img:
+                    pixels = _grayscale(img, self.scale)
+                label = _VARIANT.sub("", stem).replace("_", " ").replace("-", " ")
+                templates.append(Template(label=label, pixels=pixels, text=text))
+        return templates
+
+    def candidates(self, query: str) -> list[Template]:
+        """Templates whose label words all appear in the query."""
+        words = set(normalize_query(query).split())
+        return [
+            template
+            for template in self.templates()
+            if template.label and set(template.label.split()) <= words
+        ]
+
+    def detect(self, image: Image.Image, query: str) -> Optional[list[dict]]:
+        candidates = self.candidates(query)
+        if not candidates:
+            return None
+
+        gray = _grayscale(image, self.scale)
+        height, width = gray.shape
+        text_regions = None
+
+        best = None
+        for template in candidates:
+            h, w = template.pixels.shape
+            if template.text:
+                if text_regions is None:
+                    text_regions = find_text_regions(gray)
+                windows = [
+                    (
+                        max(0, top - h),
+                        max(0, left - w),
+                        min(height, bottom + h),
+                        min(width, right + w),
+                    )
+                    for top, left, bottom, right in text_regions
+                ]
+            else:
+                windows = [(0, 0, height, width)]
+
+            for top, left, bottom, right in windows:
+                score, y, x = match_template(
+                    gray[top:bottom, left:right], template.pixels
+                )
+                if best is None or score > best[0]:
+                    best = (score, template, top + y, left + x)
+
+        if best is None or best[0] < self.min_score:
+            return None
+
+        score, template, y, x = best
+        h, w = template.pixels.shape
+        return [
+            {
+                "label": template.label,
+                "box_2d": [
+                    round(y / height * 1000),
+                    round(x / width * 1000),
+                    round((y + h) / height * 1000),
+                    round((x + w) / width * 1000),
+                ],
+            }
+        ]
+
+
+def save_template(
+    image: Image.Image,
+    box_2d: list[int],
+    label: str,
+    directory: str,
+    text: bool = False,
+) -> str:
+    """Crops a normalized [y1 x1 y2 x2] box out of a frame into the library."""
+    width, height = image.size
+    y1, x1, y2, x2 = box_2d
+    crop = image.crop(
+        (
+            int(min(x1, x2) / 1000 * width),
+            int(min(y1, y2) / 1000 * height),
+            int(max(x1, x2) / 1000 * width),
+            int(max(y1, y2) / 1000 * height),
+        )
+    )
+    if text:
+        directory = os.path.join(directory, "text")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, normalize_query(label).replace(" ", "_") + ".png")
+    crop.save(path)
+    return path
+
+
+local_detector = LocalDetector(
+    config["TEMPLATE_LIBRARY_DIR"],
+    scale=config["DETECTOR_SCALE"],
+    min_score=config["DETECTOR_MIN_SCORE"],
+)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m phone_agent.tools.detector frame.png "settings icon" y1 x1 y2 x2
+    frame_path, label, *box = sys.argv[1:]
+    with Image.open(frame_path) as img:
+        print(
+            save_template(
+                img, list(map(int, box)), label, config["TEMPLATE_LIBRARY_DIR"]
+            )
+        )
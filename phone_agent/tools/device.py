@@ -0,0 +1,173 @@
+import contextvars
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from phone_agent.tools.capture import (
+    Box,
+    CaptureBackend,
+    ReplayBackend,
+    create_backend,
+    get_backend,
+)
+from phone_agent.tools.capture import config as capture_config
+from phone_agent.tools.frames import FrameStore, frame_store
+
+load_dotenv()
+
+config = {
+    # JSON list of mirrored devices, leave empty to drive a single phone
+    "DEVICES_PATH": os.getenv("DEVICES_PATH"),
+}
+
+DEFAULT_DEVICE = "default"
+
+
+def parse_box(value) -> Box:
+    """Reads a crop box given as "left,top,right,bottom" or a list."""
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(int(v) for v in value)
+
+
+@dataclass(eq=False)
+class DeviceContext:
+    """
+    Everything a session needs to drive one mirrored phone: where its window is
+    on the desktop, how it is captured and the frames seen so far.
+
+    Tools take x in [0, x_bound] and y in [0, y_bound] measured from the bottom
+    of the mirrored screen. `x_offset` shifts x to the device's window and
+    `y_inversion` flips y to desktop coordinates.
+    """
+
+    name: str
+    x_bound: int
+    y_bound: int
+    y_inversion: int
+    home_x: int
+    home_y: int
+    crop_box: Box
+    x_offset: int = 0
+    # None captures with the process-wide CAPTURE_BACKEND
+    capture: Optional[CaptureBackend] = None
+    frame_store: FrameStore = field(default_factory=FrameStore)
+    # Desktop position the pointer was last moved to for this device
+    pointer: Optional[tuple[int, int]] = None
+
+    @property
+    def backend(self) -> CaptureBackend:
+        return self.capture if self.capture is not None else get_backend()
+
+    def to_screen(self, x: int, y: int) -> tuple[int, int]:
+        """Converts tool coordinates to desktop coordinates."""
+        return self.x_offset + x, self.y_inversion - y
+
+    @classmethod
+    def from_env(cls) -> "DeviceContext":
+        """The single phone configured through the environment."""
+        return cls(
+            name=DEFAULT_DEVICE,
+            x_bound=int(os.getenv("MIRRORING_X_BOUND")),
+            y_bound=int(os.getenv("MIRRORING_Y_BOUND")),
+            y_inversion=int(os.getenv("SCREEN_Y_INVERSION")),
+            home_x=int(os.getenv("HOME_BUTTON_X")),
+            home_y=int(os.getenv("HOME_BUTTON_Y")),
+            crop_box=parse_box(os.getenv("IMAGE_CROP_BOX")),
+            # Shared with code that predates devices
+            frame_store=frame_store,
+        )
+
+    @classmethod
+    def from_dict(cls, spec: dict, base: "DeviceContext") -> "DeviceContext":
+        """
+        Builds a device from its entry in DEVICES_PATH. Missing settings are
+        taken from `base`, a `replay_dir` or `capture_backend` gives the device
+        its own capture backend.
+        """
+        if spec.get("replay_dir"):
+            capture = ReplayBackend(
+                spec["replay_dir"], loop=capture_config["CAPTURE_REPLAY_LOOP"]
+            )
+        elif spec.get("capture_backend"):
+            capture = create_backend(spec["capture_backend"])
+        else:
+            capture = None
+
+        return cls(
+            name=spec["name"],
+            x_bound=int(spec.get("x_bound", base.x_bound)),
+            y_bound=int(spec.get("y_bound", base.y_bound)),
+            y_inversion=int(spec.get("y_inversion", base.y_inversion)),
+            home_x=int(spec.get("home_x", base.home_x)),
+            home_y=int(spec.get("home_y", base.home_y)),
+            crop_box=parse_box(spec.get("crop_box", base.crop_box)),
+            x_offset=int(spec.get("x_offset", base.x_offset)),
+            capture=capture,
+        )
+
+
+current_device: contextvars.ContextVar[Optional[DeviceContext]] = (
+    contextvars.ContextVar("current_device", default=None)
+)
+
+_devices: dict[str, DeviceContext] = {}
+_devices_lock = threading.Lock()
+
+
+def _load_devices() -> None:
+    """Registers the default device and those in DEVICES_PATH, once."""
+    if _devices:
+        return
+    default = DeviceContext.from_env()
+    _devices[default.name] = default
+    if config["DEVICES_PATH"]:
+        with open(config["DEVICES_PATH"]) as f:
+            for spec in json.load(f):
+                device = DeviceContext.from_dict(spec, default)
+                _devices[device.name] = device
+
+
+def register_device(device: DeviceContext) -> None:
+    """Adds or replaces a device, e.g. one built in code by a scheduler."""
+    with _devices_lock:
+        _load_devices()
+        _devices[device.name] = device
+
+
+def devices() -> dict[str, DeviceContext]:
+    with _devices_lock:
+        _load_devices()
+        return dict(_devices)
+
+
+def get_device(context=None) -> DeviceContext:
+    """
+    The device a tool or callback acts on. With an ADK tool or callback
+    context, it is the one named by the session's `device` state, and it is
+    bound to the current task so helpers called without a context, and
+    background tasks started from them, use it as well. Without a context it
+    is the bound device, or the default one.
+    """
+    if context is None:
+        device = current_device.get()
+        if device is not None:
+            return device
+        name = DEFAULT_DEVICE
+    else:
+        name = context.state.get("device", DEFAULT_DEVICE)
+
+    with _devices_lock:
+        _load_devices()
+        try:
+            device = _devices[name]
+        except KeyError:
+            raise KeyError(f"Unknown device: {name}") from None
+
+    if context is not None:
+        current_device.set(device)
+    return device
@@ -0,0 +1,121 @@
+import io
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv()
+
+MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Gemini bills images up to 384px as 258 tokens, larger ones per 768px tile
+_TOKENS_PER_TILE = 258
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """How a frame is encoded before it is uploaded to a model."""
+
+    format: str = "PNG"
+    # JPEG/WebP quality, ignored for PNG
+    quality: int = 85
+    # zlib level for PNG, lower is faster and larger
+    compress_level: int = 6
+    # Frames are shrunk to fit inside max_width x max_height, never enlarged
+    max_width: Optional[int] = None
+    max_height: Optional[int] = None
+    resample: str = "LANCZOS"
+    grayscale: bool = False
+
+    def __post_init__(self):
+        if self.format not in MIME_TYPES:
+            raise ValueError(
+                f"Unsupported image format {self.format}, use one of {list(MIME_TYPES)}"
+            )
+        if not hasattr(Image.Resampling, self.resample):
+            raise ValueError(f"Unknown resampling filter {self.resample}")
+
+    @property
+    def mime_type(self) -> str:
+        return MIME_TYPES[self.format]
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "EncodingProfile":
+        """Reads {prefix}_FORMAT, _QUALITY, ... falling back to `defaults`."""
+
+        def env(name: str, default):
+            return os.getenv(f"{prefix}_{name}", default)
+
+        default = cls(**defaults)
+        return cls(
+            format=env("FORMAT", default.format).upper(),
+            quality=int(env("QUALITY", default.quality)),
+            compress_level=int(env("COMPRESS_LEVEL", default.compress_level)),
+            max_width=_optional_int(env("MAX_WIDTH", default.max_width)),
+            max_height=_optional_int(env("MAX_HEIGHT", default.max_height)),
+            resample=env("RESAMPLE", default.resample).upper(),
+            grayscale=str(env("GRAYSCALE", default.grayscale)).lower() == "true",
+        )
+
+
+def image_tokens(width: int, height: int) -> int:
+    """Approximates the input tokens Gemini charges for an image."""
+    if width <= 384 and height <= 384:
+        return _TOKENS_PER_TILE
+    return math.ceil(width / 768) * math.ceil(height / 768) * _TOKENS_PER_TILE
+
+
+def encode(image: Image.Image, profile: EncodingProfile) -> tuple[bytes, str]:
+    """Encodes a frame according to the profile, returning bytes and mime type."""
+    img = image.convert("L") if profile.grayscale else image
+
+    width, height = img.size
+    max_width = profile.max_width or width
+    max_height = profile.max_height or height
+    if width > max_width or height > max_height:
+        img = img.copy()
+        img.thumbnail(
+            (max_width, max_height), getattr(Image.Resampling, profile.resample)
+        )
+
+    if profile.format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    options = {}
+    if profile.format == "PNG":
+        options["compress_level"] = profile.compress_level
+    else:
+        options["quality"] = profile.quality
+
+    with io.BytesIO() as output:
+        img.save(output, format=profile.format, **options)
+        return output.getvalue(), profile.mime_type
+
+
+# What the agent sees after `take_screenshot`
+agent_profile = EncodingProfile.from_env("AGENT_IMAGE")
+
+# What `gemini_spatial_understanding` uploads, sized like before
+vision_profile = EncodingProfile.from_env(
+    "VISION_IMAGE",
+    max_width=_optional_int(os.getenv("CONVERSION_WIDTH")),
+    max_height=_optional_int(os.getenv("CONVERSION_HEIGHT")),
+)
+
+# The first, coarse pass of zoomed spatial understanding
+vision_coarse_profile = EncodingProfile.from_env(
+    "VISION_COARSE_IMAGE",
+    format=vision_profile.format,
+    quality=vision_profile.quality,
+    max_width=320,
+    max_height=640,
+    resample=vision_profile.resample,
+    grayscale=vision_profile.grayscale,
+)
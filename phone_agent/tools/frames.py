@@ -0,0 +1,122 @@
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from PIL import Image
+
+from phone_agent.tools.encoding import agent_profile, encode
+
+load_dotenv()
+
+config = {
+    "FRAME_CHANGE_DETECTION": os.getenv("FRAME_CHANGE_DETECTION", "true").lower()
+    == "true",
+    # Fraction of thumbnail pixels that must differ for a frame to count as new
+    "FRAME_CHANGE_THRESHOLD": float(os.getenv("FRAME_CHANGE_THRESHOLD", "0.0005")),
+    # Per-pixel grayscale difference below which a pixel counts as unchanged
+    "FRAME_PIXEL_TOLERANCE": int(os.getenv("FRAME_PIXEL_TOLERANCE", "16")),
+}
+
+THUMBNAIL_SIZE = (64, 128)  # width, height; keeps the portrait phone aspect
+HASH_SIZE = 16
+
+
+def thumbnail(image: Image.Image) -> np.ndarray:
+    """Downsamples a frame to a small grayscale array for cheap diffs."""
+    small = image.convert("L").resize(THUMBNAIL_SIZE, Image.Resampling.BILINEAR)
+    return np.asarray(small, dtype=np.int16)
+
+
+def difference_hash(image: Image.Image) -> str:
+    """Computes a 256-bit dHash of the frame as a hex string."""
+    small = image.convert("L").resize(
+        (HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR
+    )
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+
+def hash_distance(a: str, b: str) -> int:
+    """Number of differing bits between two hashes from `difference_hash`."""
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+
+def changed_fraction(a: np.ndarray, b: np.ndarray) -> float:
+    """Fraction of thumbnail pixels that differ beyond the pixel tolerance."""
+    return float(np.mean(np.abs(a - b) > config["FRAME_PIXEL_TOLERANCE"]))
+
+
+@dataclass(frozen=True, eq=False)
+class Frame:
+    """A cropped screenshot held in memory, decoded and encoded exactly once."""
+
+    id: int
+    image: Image.Image
+    data: bytes
+    fingerprint: str
+    thumbnail: np.ndarray
+    changed: bool = True
+    mime_type: str = "image/png"
+    captured_at: float = field(default_factory=time.time)
+
+
+class FrameStore:
+    """
+    Holds the latest captured frame so no tool has to go back to disk.
+
+    Every new frame is compared against the last frame that counted as changed,
+    rather than the previous one, so slow drift still adds up to a change.
+    Unchanged frames inherit the fingerprint of that reference frame.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._latest: Optional[Frame] = None
+        self._reference: Optional[Frame] = None
+
+    def put(self, image: Image.Image) -> Frame:
+        """Encodes the image once and stores it as the latest frame."""
+        small = thumbnail(image)
+
+        with self._lock:
+            reference = self._reference
+
+        changed = (
+            reference is None
+            or not config["FRAME_CHANGE_DETECTION"]
+            or reference.thumbnail.shape != small.shape
+            or changed_fraction(reference.thumbnail, small)
+            > config["FRAME_CHANGE_THRESHOLD"]
+        )
+        fingerprint = difference_hash(image) if changed else reference.fingerprint
+
+        data, mime_type = encode(image, agent_profile)
+
+        with self._lock:
+            frame = Frame(
+                id=next(self._ids),
+                image=image,
+                data=data,
+                fingerprint=fingerprint,
+                thumbnail=small,
+                changed=changed,
+                mime_type=mime_type,
+            )
+            self._latest = frame
+            if changed:
+                self._reference = frame
+        return frame
+
+    def latest(self) -> Optional[Frame]:
+        with self._lock:
+            return self._latest
+
+
+frame_store = FrameStore()
@@ -0,0 +1,285 @@
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from google import genai
+
+from phone_agent.tools.ratelimit import RateLimiter, gemini_limiter
+from phone_agent.tools.tracing import span
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+config = {
+    # Longest a single request may take, in seconds
+    "GEMINI_TIMEOUT": float(os.getenv("GEMINI_TIMEOUT", "30")),
+    # Longest a call may take including retries and backoff, in seconds
+    "GEMINI_DEADLINE": float(os.getenv("GEMINI_DEADLINE", "90")),
+    "GEMINI_MAX_RETRIES": int(os.getenv("GEMINI_MAX_RETRIES", "4")),
+    # Backoff before retry n is drawn from [0, min(max, base * 2**n)]
+    "GEMINI_BACKOFF_BASE": float(os.getenv("GEMINI_BACKOFF_BASE", "0.5")),
+    "GEMINI_BACKOFF_MAX": float(os.getenv("GEMINI_BACKOFF_MAX", "8")),
+    # Seconds before a second, hedged request is sent, 0 to never hedge
+    "GEMINI_HEDGE_AFTER": float(os.getenv("GEMINI_HEDGE_AFTER", "0")),
+}
+
+# Rate limited, timed out or failed on the server side, worth another try
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_CODES
+
+
+def create_client():
+    """A Vertex AI genai client. Building one resolves credentials, so not at import."""
+    return genai.Client(vertexai=True)
+
+
+def backoff(retry: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2**retry))
+
+
+@dataclass
+class ClientMetrics:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    failures: int = 0
+    errors: Counter = field(default_factory=Counter)
+    # Latency of successful calls, including retries, in seconds
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def as_dict(self) -> dict:
+        metrics = {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failures": self.failures,
+            "errors": dict(self.errors),
+        }
+        if len(self.latencies) >= 2:
+            cuts = statistics.quantiles(self.latencies, n=100)
+            metrics.update(
+                p50_ms=round(cuts[49] * 1000),
+                p95_ms=round(cuts[94] * 1000),
+                p99_ms=round(cuts[98] * 1000),
+            )
+        return metrics
+
+
+class GeminiClient:
+    """
+    Wraps a `genai.Client` for the vision calls: every request takes a token
+    from the shared rate limiter and is cut off after `timeout` seconds.
+    Rate limits, server errors and timeouts are retried with exponential
+    backoff until `deadline`. When `hedge_after` is set, a request still
+    running after that long gets a duplicate and the first answer wins.
+    Without a client, one is created on first use.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        limiter: Optional[RateLimiter] = None,
+        timeout: float = 30.0,
+        deadline: float = 90.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge_after: float = 0.0,
+    ):
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.limiter = limiter or RateLimiter()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.metrics = ClientMetrics()
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                with span("gemini.create_client"):
+                    self._client = create_client()
+            return self._client
+
+    @client.setter
+    def client(self, client) -> None:
+        with self._client_lock:
+            self._client = client
+
+    async def ensure_client(self) -> None:
+        if self._client is None:
+            # Resolving credentials can block on the network
+            await asyncio.to_thread(lambda: self.client)
+
+    def _timeout(self, start: float) -> float:
+        """Time the next attempt may take, raises once the deadline passed."""
+        remaining = self.deadline - (time.monotonic() - start)
+        if remaining <= 0:
+            raise TimeoutError(f"Gemini deadline of {self.deadline}s exceeded")
+        return min(self.timeout, remaining)
+
+    def _retry_delay(
+        self, error: Exception, retry: int, start: float
+    ) -> Optional[float]:
+        """Seconds to wait before retrying after `error`, None to give up."""
+        self.metrics.errors[getattr(error, "code", None) or type(error).__name__] += 1
+        delay = backoff(retry, self.backoff_base, self.backoff_max)
+        elapsed = time.monotonic() - start
+        if (
+            not retryable(error)
+            or retry == self.max_retries
+            or elapsed + delay >= self.deadline
+        ):
+            self.metrics.failures += 1
+            return None
+        logger.warning("Gemini request failed (%s), retrying in %.1fs", error, delay)
+        self.metrics.retries += 1
+        return delay
+
+    async def generate_content(self, **kwargs):
+        """`client.aio.models.generate_content` with the policies applied."""
+        self.metrics.calls += 1
+        start = time.monotonic()
+        await self.ensure_client()
+
+        for retry in range(self.max_retries + 1):
+            try:
+                response = await self._hedged(kwargs, self._timeout(start))
+            except Exception as e:
+                delay = self._retry_delay(e, retry, start)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                self.metrics.latencies.append(time.monotonic() - start)
+                return response
+
+    async def generate_content_stream(self, **kwargs):
+        """
+        `client.aio.models.generate_content_stream` with the policies applied
+        up to the first chunk. Once chunks were passed on an error ends the
+        stream, a retry would repeat them. Streams are never hedged. Close the
+        stream when stopping early, so the request and its limiter slot are
+        released.
+        """
+        self.metrics.calls += 1
+        start = time.monotonic()
+        await self.ensure_client()
+
+        for retry in range(self.max_retries + 1):
+            received = False
+            try:
+                attempt = self._stream_attempt(kwargs, self._timeout(start))
+                async with contextlib.aclosing(attempt):
+                    async for chunk in attempt:
+                        received = True
+                        yield chunk
+            except Exception as e:
+                delay = None if received else self._retry_delay(e, retry, start)
+                if delay is None:
+                    if received:
+                        self.metrics.failures += 1
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                self.metrics.latencies.append(time.monotonic() - start)
+                return
+
+    async def _attempt(self, kwargs: dict, timeout: float, hedge: bool = False):
+        async with self.limiter:
+            self.metrics.attempts += 1
+            with span("gemini.request", hedge=hedge):
+                return await asyncio.wait_for(
+                    self.client.aio.models.generate_content(**kwargs), timeout
+                )
+
+    async def _stream_attempt(self, kwargs: dict, timeout: float):
+        async with self.limiter:
+            self.metrics.attempts += 1
+            with span("gemini.request", stream=True) as request:
+                end = time.monotonic() + timeout
+                stream = await asyncio.wait_for(
+                    self.client.aio.models.generate_content_stream(**kwargs), timeout
+                )
+                chunks = 0
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(
+                                anext(stream), end - time.monotonic()
+                            )
+                        except StopAsyncIteration:
+                            return
+                        chunks += 1
+                        yield chunk
+                finally:
+                    request.attributes["chunks"] = chunks
+                    await stream.aclose()
+
+    async def _hedged(self, kwargs: dict, timeout: float):
+        if not self.hedge_after or self.hedge_after >= timeout:
+            return await self._attempt(kwargs, timeout)
+
+        primary = asyncio.create_task(self._attempt(kwargs, timeout))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                self.metrics.hedges += 1
+                tasks.append(
+                    asyncio.create_task(
+                        self._attempt(kwargs, timeout - self.hedge_after, hedge=True)
+                    )
+                )
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.metrics.hedge_wins += 1
+                        return task.result()
+            # Every request failed, surface the first one's error
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+gemini_client = GeminiClient(
+    limiter=gemini_limiter,
+    timeout=config["GEMINI_TIMEOUT"],
+    deadline=config["GEMINI_DEADLINE"],
+    max_retries=config["GEMINI_MAX_RETRIES"],
+    backoff_base=config["GEMINI_BACKOFF_BASE"],
+    backoff_max=config["GEMINI_BACKOFF_MAX"],
+    hedge_after=config["GEMINI_HEDGE_AFTER"],
+)
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import threading
+from collections import Counter
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+config = {
+    "INPUT_BACKEND": os.getenv("INPUT_BACKEND", "pyautogui"),
+}
+
+
+class InputBackend:
+    """Injects mouse and keyboard events into the mirrored phone."""
+
+    name = "base"
+
+    def move_to(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def click(self) -> None:
+        raise NotImplementedError
+
+    def hscroll(self, clicks: int) -> None:
+        raise NotImplementedError
+
+    def vscroll(self, clicks: int) -> None:
+        raise NotImplementedError
+
+    def write(self, text: str, interval: float) -> None:
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def is_valid_key(self, key: str) -> bool:
+        raise NotImplementedError
+
+
+class PyAutoGUIBackend(InputBackend):
+    """Drives the real mouse and keyboard."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        # pyautogui connects to the display on import, only do that when used
+        import pyautogui
+
+        self._pyautogui = pyautogui
+
+    def move_to(self, x: int, y: int) -> None:
+        self._pyautogui.moveTo(x, y)
+
+    def click(self) -> None:
+        self._pyautogui.click()
+
+    def hscroll(self, clicks: int) -> None:
+        self._pyautogui.hscroll(clicks=clicks)
+
+    def vscroll(self, clicks: int) -> None:
+        self._pyautogui.vscroll(clicks=clicks)
+
+    def write(self, text: str, interval: float) -> None:
+        self._pyautogui.write(text, interval=interval)
+
+    def hotkey(self, *keys: str) -> None:
+        self._pyautogui.hotkey(*keys)
+
+    def is_valid_key(self, key: str) -> bool:
+        return self._pyautogui.isValidKey(key)
+
+
+class NullInputBackend(InputBackend):
+    """Swallows every event and only counts them, for runs without a phone."""
+
+    name = "null"
+
+    def __init__(self):
+        self.events = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, event: str) -> None:
+        with self._lock:
+            self.events[event] += 1
+
+    def move_to(self, x: int, y: int) -> None:
+        self._count("move_to")
+
+    def click(self) -> None:
+        self._count("click")
+
+    def hscroll(self, clicks: int) -> None:
+        self._count("hscroll")
+
+    def vscroll(self, clicks: int) -> None:
+        self._count("vscroll")
+
+    def write(self, text: str, interval: float) -> None:
+        self._count("write")
+
+    def hotkey(self, *keys: str) -> None:
+        self._count("hotkey")
+
+    def is_valid_key(self, key: str) -> bool:
+        return True
+
+
+_input: Optional[InputBackend] = None
+_input_lock = threading.Lock()
+
+
+def create_input(name: str) -> InputBackend:
+    """Builds the input backend registered under `name`."""
+    if name == PyAutoGUIBackend.name:
+        return PyAutoGUIBackend()
+    if name == NullInputBackend.name:
+        return NullInputBackend()
+    raise ValueError(f"Unknown input backend: {name}")
+
+
+def get_input() -> InputBackend:
+    """Returns the process-wide backend selected by INPUT_BACKEND."""
+    global _input
+    with _input_lock:
+        if _input is None:
+            _input = create_input(config["INPUT_BACKEND"])
+        return _input
+
+
+def set_input(backend: InputBackend) -> None:
+    """Replaces the process-wide backend, e.g. with a null sink for benchmarks."""
+    global _input
+    with _input_lock:
+        _input = backend
+
+
+class InputLock:
+    """
+    Serializes access to the one mouse and keyboard shared by every device
+    session, so a move and the click that follows it are never interleaved
+    with another session's events. `owner` is the device that injected last,
+    its window is where the pointer is and what has keyboard focus.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.owner = None
+
+    async def __aenter__(self) -> "InputLock":
+        await self._lock.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._lock.release()
+
+
+input_lock = InputLock()
@@ -0,0 +1,81 @@
+import json
+
+
+class JSONArrayStream:
+    """
+    Parses a JSON array as its text arrives in pieces. `feed` returns the
+    elements the new text completed, so the first object of a long array can
+    be used while the rest is still being generated. Text before the opening
+    bracket, like markdown fencing, is skipped, as is anything after the
+    closing one.
+    """
+
+    def __init__(self):
+        self._chunks: list[str] = []
+        self._element: list[str] = []
+        # 1 inside the top-level array, 0 before it
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.complete = False
+        self.count = 0
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chunks)
+
+    def _flush(self) -> list:
+        value = "".join(self._element).strip()
+        self._element.clear()
+        if not value:
+            return []
+        self.count += 1
+        return [json.loads(value)]
+
+    def feed(self, text: str) -> list:
+        """
+        Consumes the next piece of text and returns the completed elements.
+        Raises `json.JSONDecodeError` for an element that is not valid JSON.
+        """
+        self._chunks.append(text)
+        elements = []
+        for char in text:
+            if self.complete:
+                break
+            if self._depth == 0:
+                if char == "[":
+                    self._depth = 1
+                    self.started = True
+                continue
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._element.append(char)
+                self._in_string = True
+            elif char in "[{":
+                self._element.append(char)
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    elements.extend(self._flush())
+                    self.complete = True
+                    break
+                self._element.append(char)
+                if self._depth == 1:
+                    # An object or array just closed, hand it out right away
+                    elements.extend(self._flush())
+            elif char == "," and self._depth == 1:
+                elements.extend(self._flush())
+            else:
+                self._element.append(char)
+        return elements
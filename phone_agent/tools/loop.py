@@ -1,7 +1,11 @@
 import asyncio
+from typing import Optional
 
 from google.adk.tools import ToolContext
 
+from phone_agent.tools.device import get_device
+from phone_agent.tools.settle import wait_for_settle
+
 
 async def pause_loop(explanation: str, duration: int) -> dict:
     """
@@ -20,6 +24,32 @@ async def pause_loop(explanation: str, duration: int) -> dict:
     return {"status": "task continued after pause"}
 
 
+async def wait_until_settled(
+    explanation: str, timeout: int, tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Waits until the iPhone screen stops changing, for example while an app is
+    launching or a page is loading, and returns as soon as it is stable.
+    Prefer this over `pause_loop` when waiting for the UI itself.
+
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+        timeout (int): The longest time to wait in seconds.
+
+    Returns:
+        dict: Whether the screen settled and how long it took.
+    """
+    get_device(tool_context)
+    result = await wait_for_settle(timeout=timeout)
+    if not result.settled:
+        return {
+            "status": "screen still changing",
+            "message": f"The screen did not settle within {timeout} seconds.",
+            **result.as_dict(),
+        }
+    return {"status": "screen settled", **result.as_dict()}
+
+
 def human_intervention(explanation: str, tool_context: ToolContext):
     """
     Interrupts the autonomous loop to allow for USER input and intervention.
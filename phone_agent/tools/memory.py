@@ -0,0 +1,302 @@
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from phone_agent.tools.cache import normalize_query
+from phone_agent.tools.device import DeviceContext
+from phone_agent.tools.frames import hash_distance
+
+load_dotenv()
+
+config = {
+    "NAVIGATION_MEMORY": os.getenv("NAVIGATION_MEMORY", "true").lower() == "true",
+    "NAVIGATION_MEMORY_PATH": os.getenv("NAVIGATION_MEMORY_PATH"),
+    # Most screens remembered, the least recently seen unlabeled one goes first
+    "NAVIGATION_MEMORY_SIZE": int(os.getenv("NAVIGATION_MEMORY_SIZE", "1000")),
+    # Fingerprint bits two frames may differ in and still be the same screen,
+    # enough for the clock and battery level in the status bar
+    "NAVIGATION_MATCH_DISTANCE": int(os.getenv("NAVIGATION_MATCH_DISTANCE", "16")),
+    # New transitions between writes of the graph, it is also written at exit
+    "NAVIGATION_MEMORY_SAVE_EVERY": int(
+        os.getenv("NAVIGATION_MEMORY_SAVE_EVERY", "20")
+    ),
+}
+
+# Source of transitions that lead to the same screen from anywhere
+ANY_SCREEN = "*"
+
+
+def _actions_key(actions: list[dict]) -> str:
+    return json.dumps(actions, sort_keys=True)
+
+
+class NavigationMemory:
+    """
+    A graph of the screens seen so far, keyed by frame fingerprint, and of the
+    actions that led from one to the next. Actions taken through the
+    navigation tools are collected per device until a screenshot shows a
+    different screen, which closes the transition. Screens the agent labeled
+    can then be reached again by replaying the shortest known path.
+
+    Fingerprints within `match_distance` bits of a known screen count as that
+    screen. The home button leads to the same screen from anywhere, so its
+    transitions start from `ANY_SCREEN`. Replaying a path goes through the
+    same tools, so a transition that now leads somewhere else is overwritten
+    with where it went. When a path is given the graph is also persisted as
+    JSON so it survives restarts, every `save_every` new transitions, right
+    away for a new label, and at exit. Callers on the event loop run
+    `record_frame` and `label` in a thread, since either may write it.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        enabled: bool = True,
+        max_screens: int = 1000,
+        match_distance: int = 16,
+        save_every: int = 20,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.max_screens = max_screens
+        self.match_distance = match_distance
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        # Serializes the writes, which happen outside `_lock`
+        self._save_lock = threading.Lock()
+        # Changes since the graph was last copied for writing
+        self._unsaved = 0
+        # Numbers the copies, so an older one never overwrites a newer one
+        self._version = 0
+        self._saved_version = 0
+        # Screen fingerprint to its labels, least recently seen first
+        self._screens: OrderedDict[str, list[str]] = OrderedDict()
+        # Source screen to {actions key: destination screen}
+        self._edges: dict[str, dict[str, str]] = {}
+        # Device name to (source screen, actions taken since)
+        self._pending: dict[str, tuple[Optional[str], list[dict]]] = {}
+        if path:
+            self._load()
+            atexit.register(self.flush)
+
+    def _match(self, fingerprint: str) -> Optional[str]:
+        """The known screen closest to the fingerprint, if close enough."""
+        if fingerprint in self._screens:
+            return fingerprint
+        best, best_distance = None, self.match_distance + 1
+        for screen in self._screens:
+            distance = hash_distance(screen, fingerprint)
+            if distance < best_distance:
+                best, best_distance = screen, distance
+        return best
+
+    def _intern(self, fingerprint: str) -> str:
+        screen = self._match(fingerprint)
+        if screen is None:
+            screen = fingerprint
+            self._screens[screen] = []
+            self._evict()
+        self._screens.move_to_end(screen)
+        return screen
+
+    def _evict(self) -> None:
+        while len(self._screens) > self.max_screens:
+            unlabeled = next(
+                (screen for screen, labels in self._screens.items() if not labels),
+                None,
+            )
+            if unlabeled is None:
+                return
+            del self._screens[unlabeled]
+            self._edges.pop(unlabeled, None)
+            for edges in self._edges.values():
+                for key in [k for k, to in edges.items() if to == unlabeled]:
+                    del edges[key]
+
+    def matches(self, a: str, b: str) -> bool:
+        return hash_distance(a, b) <= self.match_distance
+
+    def record_action(
+        self, device: DeviceContext, action: dict, anywhere: bool = False
+    ) -> None:
+        """
+        Adds an action taken on the device to its open transition. An action
+        with `anywhere` set leads to the same screen wherever it is taken, so
+        the actions before it are dropped.
+        """
+        if not self.enabled:
+            return
+        frame = device.frame_store.latest()
+        with self._lock:
+            if anywhere:
+                self._pending[device.name] = (ANY_SCREEN, [action])
+                return
+            source, actions = self._pending.get(device.name, (None, []))
+            if not actions:
+                source = self._intern(frame.fingerprint) if frame else None
+            self._pending[device.name] = (source, [*actions, action])
+
+    def forget_pending(self, device: DeviceContext) -> None:
+        """Drops the open transition, for actions that should not be replayed."""
+        with self._lock:
+            self._pending.pop(device.name, None)
+
+    def record_frame(self, device: DeviceContext, fingerprint: str) -> None:
+        """Closes the device's open transition when the screen changed."""
+        if not self.enabled:
+            return
+        with self._lock:
+            source, actions = self._pending.get(device.name, (None, []))
+            if not actions:
+                return
+            if source is None:
+                # Acted before any screenshot, the transition can't be placed
+                del self._pending[device.name]
+                return
+            if source != ANY_SCREEN and self.matches(source, fingerprint):
+                # Pointer moves and the like, keep collecting
+                return
+
+            destination = self._intern(fingerprint)
+            del self._pending[device.name]
+            if destination == source:
+                return
+            self._edges.setdefault(source, {})[_actions_key(actions)] = destination
+            graph = self._changed()
+        if graph is not None:
+            self._save(*graph)
+
+    def label(self, fingerprint: str, label: str) -> None:
+        """Names the screen with the fingerprint so it can be navigated to."""
+        label = normalize_query(label)
+        with self._lock:
+            screen = self._intern(fingerprint)
+            if label in self._screens[screen]:
+                return
+            self._screens[screen].append(label)
+            # Labels are rare and what navigate_to needs, keep them right away
+            graph = self._changed(now=True)
+        if graph is not None:
+            self._save(*graph)
+
+    def labels(self) -> list[str]:
+        with self._lock:
+            return sorted(
+                {label for labels in self._screens.values() for label in labels}
+            )
+
+    def path_to(
+        self, fingerprint: str, label: str
+    ) -> Optional[list[tuple[list[dict], str]]]:
+        """
+        The shortest known path from the screen with the fingerprint to a
+        screen with the label, as (actions, expected screen) hops. Empty when
+        already there, None when no path is known.
+        """
+        label = normalize_query(label)
+        with self._lock:
+            start = self._match(fingerprint)
+            if start is not None and label in self._screens[start]:
+                return []
+
+            anywhere = self._edges.get(ANY_SCREEN, {})
+            queue = deque([start])
+            previous: dict = {start: None}
+            while queue:
+                screen = queue.popleft()
+                for key, destination in [
+                    *self._edges.get(screen, {}).items(),
+                    *anywhere.items(),
+                ]:
+                    if destination in previous:
+                        continue
+                    previous[destination] = (screen, key)
+                    if label in self._screens.get(destination, []):
+                        return self._unwind(previous, destination)
+                    queue.append(destination)
+        return None
+
+    @staticmethod
+    def _unwind(previous: dict, destination: str) -> list[tuple[list[dict], str]]:
+        hops = []
+        while previous[destination] is not None:
+            screen, key = previous[destination]
+            hops.append((json.loads(key), destination))
+            destination = screen
+        return hops[::-1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "screens": len(self._screens),
+                "labeled": sum(1 for labels in self._screens.values() if labels),
+                "transitions": sum(len(edges) for edges in self._edges.values()),
+            }
+
+    def flush(self) -> None:
+        """Writes the changes not written yet."""
+        with self._lock:
+            graph = self._changed(now=True) if self._unsaved else None
+        if graph is not None:
+            self._save(*graph)
+
+    def _changed(self, now: bool = False) -> Optional[tuple[int, dict]]:
+        """
+        Counts a change, called holding the lock. Returns a numbered copy of
+        the graph when it is due to be written.
+        """
+        if not self.path:
+            return None
+        self._unsaved += 1
+        if not now and self._unsaved < self.save_every:
+            return None
+        self._unsaved = 0
+        self._version += 1
+        return self._version, {
+            "screens": {
+                screen: list(labels) for screen, labels in self._screens.items()
+            },
+            "transitions": [
+                [source, json.loads(key), destination]
+                for source, edges in self._edges.items()
+                for key, destination in edges.items()
+            ],
+        }
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                graph = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+
+        self._screens.update(graph["screens"])
+        for source, actions, destination in graph["transitions"]:
+            self._edges.setdefault(source, {})[_actions_key(actions)] = destination
+
+    def _save(self, version: int, graph: dict) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._save_lock:
+            if version <= self._saved_version:
+                return
+            self._saved_version = version
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(graph, f)
+            os.replace(tmp_path, self.path)
+
+
+navigation_memory = NavigationMemory(
+    path=config["NAVIGATION_MEMORY_PATH"],
+    enabled=config["NAVIGATION_MEMORY"],
+    max_screens=config["NAVIGATION_MEMORY_SIZE"],
+    match_distance=config["NAVIGATION_MATCH_DISTANCE"],
+    save_every=config["NAVIGATION_MEMORY_SAVE_EVERY"],
+)
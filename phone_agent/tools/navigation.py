@@ -1,21 +1,39 @@
-import os
-import time
+import asyncio
+from typing import Optional
 
-import pyautogui
-from dotenv import load_dotenv
+from google.adk.tools import ToolContext
 
-load_dotenv()
+from phone_agent.tools.device import DeviceContext, get_device
+from phone_agent.tools.injection import get_input, input_lock
+from phone_agent.tools.memory import navigation_memory
+from phone_agent.tools.prefetch import prefetcher
+from phone_agent.tools.settle import settle
+from phone_agent.tools.text_input import enter_text
 
-config = {
-    "SCREEN_Y_BOUND": int(os.getenv("MIRRORING_Y_BOUND")),
-    "SCREEN_X_BOUND": int(os.getenv("MIRRORING_X_BOUND")),
-    "SCREEN_Y_INVERSION": int(os.getenv("SCREEN_Y_INVERSION")),
-    "HOME_BUTTON_X": int(os.getenv("HOME_BUTTON_X")),
-    "HOME_BUTTON_Y": int(os.getenv("HOME_BUTTON_Y")),
-}
 
+async def _move(device: DeviceContext, x: int, y: int) -> None:
+    """Moves the shared pointer onto the device, `input_lock` must be held."""
+    position = device.to_screen(x, y)
+    await asyncio.to_thread(get_input().move_to, *position)
+    device.pointer = position
+    input_lock.owner = device
 
-def home_screen(explanation: str) -> dict:
+
+async def _reclaim_pointer(device: DeviceContext) -> bool:
+    """
+    Puts the pointer back where this device left it when another device used
+    it since. Returns whether it had to, `input_lock` must be held.
+    """
+    moved = input_lock.owner is not device and device.pointer is not None
+    if moved:
+        await asyncio.to_thread(get_input().move_to, *device.pointer)
+    input_lock.owner = device
+    return moved
+
+
+async def home_screen(
+    explanation: str, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Navigates the iPhone back to the home screen. Equivalent to the primary home
     gesture (swipe up from bottom or home button press). Use this to establish a
@@ -27,18 +45,22 @@ def home_screen(explanation: str) -> dict:
     Returns:
         dict: The outcome of clicking the home button.
     """
-    x = config["HOME_BUTTON_X"]
-    y = config["HOME_BUTTON_Y"]
-    y = config["SCREEN_Y_INVERSION"] - y
-
-    pyautogui.moveTo(x, y)
-    time.sleep(0.1)  # Let the UI update
-    pyautogui.click()
-    time.sleep(0.1)
-    return {"status": "home button clicked"}
-
-
-def move_pointer(explanation: str, x: int, y: int) -> dict:
+    device = get_device(tool_context)
+
+    prefetcher.action_started()
+    async with input_lock:
+        await _move(device, device.home_x, device.home_y)
+        await asyncio.sleep(0.1)  # Let the UI update
+        await asyncio.to_thread(get_input().click)
+    navigation_memory.record_action(device, {"action": "home_screen"}, anywhere=True)
+    settled = await settle()
+    prefetcher.schedule()
+    return {"status": "home button clicked", **settled}
+
+
+async def move_pointer(
+    explanation: str, x: int, y: int, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Moves the touch pointer to a specific coordinate (x, y) on the screen.
     Coordinates must be obtained first using the `locate_UI_elements` tool.
@@ -54,29 +76,35 @@ def move_pointer(explanation: str, x: int, y: int) -> dict:
     Returns:
         dict: The outcome of the move pointer process.
     """
-    if x > config["SCREEN_X_BOUND"] or x < 0:
+    device = get_device(tool_context)
+
+    if x > device.x_bound or x < 0:
         return {
             "status": "error",
             "message": f"""Invalid coordinates.
-            The x values should be between 0 and {config["SCREEN_X_BOUND"]}.
+            The x values should be between 0 and {device.x_bound}.
             """,
         }
-    if y > config["SCREEN_Y_BOUND"] or y < 0:
+    if y > device.y_bound or y < 0:
         return {
             "status": "error",
             "message": f"""Invalid coordinates.
-            The y values should be between 0 and {config["SCREEN_Y_BOUND"]}.
+            The y values should be between 0 and {device.y_bound}.
             """,
         }
 
-    y = config["SCREEN_Y_INVERSION"] - y
+    prefetcher.action_started()
+    async with input_lock:
+        await _move(device, x, y)
+    navigation_memory.record_action(device, {"action": "move_pointer", "x": x, "y": y})
+    settled = await settle()  # Let the UI update
+    prefetcher.schedule()
+    return {"status": "pointer moved", **settled}
 
-    pyautogui.moveTo(x, y)
-    time.sleep(0.1)  # Let the UI update
-    return {"status": "pointer moved"}
 
-
-def click_pointer(explanation: str) -> dict:
+async def click_pointer(
+    explanation: str, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Performs a click action at the current touch pointer location. Ensure the
     pointer is correctly positioned using `move_pointer` before calling this.
@@ -89,57 +117,62 @@ def click_pointer(explanation: str) -> dict:
     Returns:
         dict: The outcome of the click process.
     """
-    pyautogui.click()
-    time.sleep(0.1)
-    pyautogui.click()
-    time.sleep(0.1)
-    return {"status": "pointer clicked"}
+    device = get_device(tool_context)
 
+    prefetcher.action_started()
+    async with input_lock:
+        await _reclaim_pointer(device)
+        await asyncio.to_thread(get_input().click)
+        await asyncio.sleep(0.1)
+        await asyncio.to_thread(get_input().click)
+    navigation_memory.record_action(device, {"action": "click_pointer"})
+    settled = await settle()
+    prefetcher.schedule()
+    return {"status": "pointer clicked", **settled}
 
-def _center_mouse() -> dict:
-    x_center, y_center = config["SCREEN_X_BOUND"] / 2, config["SCREEN_Y_BOUND"] / 2
-    move_pointer(explanation="", x=x_center, y=y_center)
-    time.sleep(0.1)
-    return {"status": "mouse centered"}
 
+async def _scroll_screen(scroll: str, clicks: int) -> dict:
+    device = get_device()
 
-def _hscroll_screen(direction: int) -> dict:
-    _center_mouse()
+    prefetcher.action_started()
+    async with input_lock:
+        # Scroll events go to the window under the pointer, center it first
+        await _move(device, device.x_bound // 2, device.y_bound // 2)
+        await asyncio.sleep(0.1)
+        await asyncio.to_thread(getattr(get_input(), scroll), clicks)
+        await asyncio.to_thread(getattr(get_input(), scroll), clicks)
+    settled = await settle()
+    prefetcher.schedule()
+    return {"status": "scrolled screen", **settled}
 
-    clicks = 5000 if direction == 1 else -5000
-    pyautogui.hscroll(clicks=clicks)
-    pyautogui.hscroll(clicks=clicks)
-    time.sleep(0.1)
-    return {"status": "scrolled screen"}
 
+async def _hscroll_screen(direction: int) -> dict:
+    return await _scroll_screen("hscroll", 5000 if direction == 1 else -5000)
 
-def _vscroll_screen(direction: int) -> dict:
-    _center_mouse()
 
-    clicks = 5000 if direction == 1 else -5000
-    pyautogui.vscroll(clicks=clicks)
-    pyautogui.vscroll(clicks=clicks)
-    time.sleep(0.1)
-    return {"status": "scrolled screen"}
+async def _vscroll_screen(direction: int) -> dict:
+    return await _scroll_screen("vscroll", 5000 if direction == 1 else -5000)
 
 
-def _scroll_left() -> dict:
-    return _hscroll_screen(1)
+async def _scroll_left() -> dict:
+    return await _hscroll_screen(1)
 
 
-def _scroll_right() -> dict:
-    return _hscroll_screen(-1)
+async def _scroll_right() -> dict:
+    return await _hscroll_screen(-1)
 
 
-def _scroll_up() -> dict:
-    return _vscroll_screen(1)
+async def _scroll_up() -> dict:
+    return await _vscroll_screen(1)
 
 
-def _scroll_down() -> dict:
-    return _vscroll_screen(-1)
+async def _scroll_down() -> dict:
+    return await _vscroll_screen(-1)
 
 
-def scroll_screen(explanation: str, direction: str) -> dict:
+async def scroll_screen(
+    explanation: str, direction: str, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Scrolls the screen content in a specified direction (up, down, left, right).
     Use this to reveal elements that are currently off-screen.
@@ -152,24 +185,31 @@ def scroll_screen(explanation: str, direction: str) -> dict:
     Returns:
         dict: The outcome of the swipe process.
     """
+    device = get_device(tool_context)
     direction = direction.lower().strip()
     if direction == "left":
-        return _scroll_left()
+        scrolled = await _scroll_left()
     elif direction == "right":
-        return _scroll_right()
+        scrolled = await _scroll_right()
     elif direction == "up":
-        return _scroll_up()
+        scrolled = await _scroll_up()
     elif direction == "down":
-        return _scroll_down()
+        scrolled = await _scroll_down()
     else:
         return {"status": "error", "message": "Invalid direction"}
+    navigation_memory.record_action(
+        device, {"action": "scroll_screen", "direction": direction}
+    )
+    return scrolled
 
 
-def enter_keys(explanation: str, text: str) -> dict:
+async def enter_keys(
+    explanation: str, text: str, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Enters the specified text into the currently focused text input field.
-    This tool is only able to enter default characters found on a physical QWERTY keyboard.
-    It does not support special characters or emojis.
+    Characters found on a physical keyboard are typed, text with any other
+    characters (accented letters, symbols, emojis) is pasted instead.
     Ensure a text field is selected before calling this. For sensitive
     information like passwords, confirm with the USER first if not explicitly
     permitted.
@@ -181,15 +221,26 @@ def enter_keys(explanation: str, text: str) -> dict:
     Returns:
         dict: The outcome of the key entry process.
     """
+    device = get_device(tool_context)
+
+    prefetcher.action_started()
     try:
-        for key in text:
-            pyautogui.press(key)
-            time.sleep(0.1)
+        async with input_lock:
+            # Keystrokes go to the window clicked last, refocus the field
+            # this device was typing into when another device took over
+            if await _reclaim_pointer(device):
+                await asyncio.to_thread(get_input().click)
+                await asyncio.sleep(0.1)
+            entry = await enter_text(text)
+        # Typed text may be private, a path through it is never replayed
+        navigation_memory.forget_pending(device)
     except Exception as e:
         return {"status": "error", "message": f"Error entering keys: {str(e)}"}
-    return {"status": "keys entered"}
+    settled = await settle(fixed_delay=0)
+    prefetcher.schedule()
+    return {"status": "keys entered", **entry, **settled}
 
 
 if __name__ == "__main__":
-    print(move_pointer(explanation="", x=150, y=330))
-    print(scroll_screen(explanation="", direction="up"))
+    print(asyncio.run(move_pointer(explanation="", x=150, y=330)))
+    print(asyncio.run(scroll_screen(explanation="", direction="up")))
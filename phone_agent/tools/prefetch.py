@@ -0,0 +1,87 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Optional
+
+from dotenv import load_dotenv
+from PIL import Image
+
+from phone_agent.tools.device import DeviceContext, get_device
+from phone_agent.tools.settle import config as settle_config
+from phone_agent.tools.settle import wait_for_settle
+
+load_dotenv()
+
+config = {
+    "PREFETCH_SCREENSHOTS": os.getenv("PREFETCH_SCREENSHOTS", "false").lower()
+    == "true",
+    # Time the UI gets to settle after an action before the frame is grabbed
+    "PREFETCH_SETTLE_DELAY": float(os.getenv("PREFETCH_SETTLE_DELAY", "0.5")),
+    # Prefetched frames older than this are thrown away
+    "PREFETCH_MAX_AGE": float(os.getenv("PREFETCH_MAX_AGE", "10")),
+}
+
+
+class Prefetcher:
+    """
+    Grabs the post-action frame in the background while the model is thinking,
+    so the `take_screenshot` that almost always follows an action returns
+    immediately. Every action bumps a generation counter, a frame grabbed for
+    an older generation is never handed out. Each device has its own pending
+    frame and generation.
+    """
+
+    def __init__(self):
+        self._generations: dict[str, int] = defaultdict(int)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def action_started(self) -> None:
+        """Invalidates any pending frame, the screen is about to change."""
+        name = get_device().name
+        self._generations[name] += 1
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    def schedule(self) -> None:
+        """Starts grabbing the frame that results from the action just taken."""
+        if not config["PREFETCH_SCREENSHOTS"]:
+            return
+        device = get_device()
+        self.action_started()
+        self._tasks[device.name] = asyncio.create_task(
+            self._grab(device, self._generations[device.name])
+        )
+
+    async def _grab(
+        self, device: DeviceContext, generation: int
+    ) -> tuple[int, float, Image.Image]:
+        if settle_config["SETTLE_DETECTION"]:
+            await wait_for_settle()
+        else:
+            await asyncio.sleep(config["PREFETCH_SETTLE_DELAY"])
+        image = await device.backend.agrab(device.crop_box)
+        return generation, time.monotonic(), image
+
+    async def take(self) -> Optional[Image.Image]:
+        """Returns the prefetched frame if it is still current, otherwise None."""
+        name = get_device().name
+        task = self._tasks.pop(name, None)
+        if task is None or task.cancelled():
+            return None
+
+        try:
+            generation, grabbed_at, image = await task
+        except Exception:
+            # Let the regular capture path surface the error
+            return None
+
+        if generation != self._generations[name]:
+            return None
+        if time.monotonic() - grabbed_at > config["PREFETCH_MAX_AGE"]:
+            return None
+        return image
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+config = {
+    # Gemini requests per minute shared by every session, 0 for no limit
+    "GEMINI_REQUESTS_PER_MINUTE": float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "0")),
+    # Requests allowed back to back before the rate applies
+    "GEMINI_BURST": int(os.getenv("GEMINI_BURST", "1")),
+    # Vision requests in flight at once, 0 for no limit
+    "GEMINI_MAX_CONCURRENCY": int(os.getenv("GEMINI_MAX_CONCURRENCY", "0")),
+}
+
+
+class RateLimiter:
+    """
+    Token bucket refilled at `rate` requests per second holding at most `burst`
+    tokens, optionally capping the requests in flight. Used as an async context
+    manager around a request, or through `acquire` for a token only.
+    """
+
+    def __init__(self, rate: float = 0.0, burst: int = 1, concurrency: int = 0):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = (
+            asyncio.Semaphore(concurrency) if concurrency > 0 else None
+        )
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns how long that took in seconds."""
+        if self.rate <= 0:
+            return 0.0
+
+        start = time.monotonic()
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def __aenter__(self) -> "RateLimiter":
+        if self._semaphore is not None:
+            await self._semaphore.acquire()
+        try:
+            await self.acquire()
+        except BaseException:
+            if self._semaphore is not None:
+                self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+gemini_limiter = RateLimiter(
+    rate=config["GEMINI_REQUESTS_PER_MINUTE"] / 60,
+    burst=config["GEMINI_BURST"],
+    concurrency=config["GEMINI_MAX_CONCURRENCY"],
+)
+
+
+async def limit_model_requests(callback_context, llm_request) -> None:
+    """Before-model callback making the agent's model calls share the limit."""
+    await gemini_limiter.acquire()
+    return None
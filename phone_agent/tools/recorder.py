@@ -0,0 +1,289 @@
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from PIL import Image
+
+from phone_agent.tools.device import DeviceContext, get_device
+from phone_agent.tools.frames import Frame
+from phone_agent.tools.tracing import current_session
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+config = {
+    "RECORD_SESSIONS": os.getenv("RECORD_SESSIONS", "false").lower() == "true",
+    "RECORD_DIR": os.getenv("RECORD_DIR", "phone_agent/data/recordings"),
+    # Records waiting for the writer, each may hold a frame in memory. Later
+    # ones are dropped when it is full
+    "RECORD_QUEUE_SIZE": int(os.getenv("RECORD_QUEUE_SIZE", "64")),
+    # Draw the boxes of every lookup onto its frame while recording
+    "RECORD_OVERLAYS": os.getenv("RECORD_OVERLAYS", "false").lower() == "true",
+}
+
+EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+
+_STOP = object()
+
+
+def frame_digest(data: bytes) -> str:
+    """The content address of an encoded frame."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class SessionRecorder:
+    """
+    Keeps a post-mortem record of what the agent saw and did without slowing
+    it down. The tools only put records on a bounded queue, a background
+    thread stores the frames under their content hash, so an unchanged
+    screen is written once, and appends one JSON line per record to the
+    index. When the writer falls behind, records are dropped and counted
+    rather than making the agent wait.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        enabled: bool = True,
+        queue_size: int = 64,
+        overlays: bool = False,
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self.overlays = overlays
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stored: set[str] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def frames_directory(self) -> str:
+        return os.path.join(self.directory, "frames")
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.jsonl")
+
+    def frame_path(self, digest: str, mime_type: str) -> str:
+        return os.path.join(
+            self.frames_directory, digest[:2], digest + EXTENSIONS.get(mime_type, "")
+        )
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="session-recorder", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _put(self, kind: str, device: Optional[DeviceContext], fields: dict) -> None:
+        if not self.enabled:
+            return
+        self._start()
+        record = {
+            "time": time.time(),
+            "session": current_session.get(),
+            "device": device.name if device else None,
+            "kind": kind,
+            **fields,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(
+                    "Session recorder is behind, %d records dropped", self.dropped
+                )
+
+    def record_frame(self, device: DeviceContext, frame: Frame) -> None:
+        """A new screenshot, stored as the bytes the agent was sent."""
+        self._put("frame", device, {"frame": frame, "changed": frame.changed})
+
+    def record_lookup(
+        self,
+        device: DeviceContext,
+        frame: Frame,
+        queries: list[str],
+        results: dict[str, list[dict]],
+    ) -> None:
+        """
+        The boxes found per query on a frame, in grid coordinates. The
+        overlay is only drawn when RECORD_OVERLAYS is set, otherwise the
+        `render` command draws it from the index later.
+        """
+        if not self.enabled:
+            return
+        # The tools convert the boxes in place after this, keep the originals
+        results = {
+            query: [dict(bounding_box) for bounding_box in bounding_boxes]
+            for query, bounding_boxes in results.items()
+        }
+        self._put(
+            "lookup",
+            device,
+            {"frame": frame, "queries": queries, "results": results},
+        )
+
+    def record_vision(self, prompt: str, text: str, **attributes) -> None:
+        """A raw spatial understanding response, before it is parsed."""
+        self._put("vision", None, {"prompt": prompt, "text": text, **attributes})
+
+    def record_tool_call(
+        self, device: DeviceContext, name: str, args: dict, response
+    ) -> None:
+        self._put("tool", device, {"tool": name, "args": args, "response": response})
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued record is written, False on timeout."""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Writes what is queued and stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def _store(self, frame: Frame) -> str:
+        digest = frame_digest(frame.data)
+        if digest not in self._stored:
+            path = self.frame_path(digest, frame.mime_type)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(frame.data)
+                os.replace(tmp_path, path)
+            self._stored.add(digest)
+        return digest
+
+    def _write(self, index, record: dict) -> None:
+        frame = record.pop("frame", None)
+        if frame is not None:
+            record["frame"] = self._store(frame)
+            record["mime_type"] = frame.mime_type
+            if record["kind"] == "lookup" and self.overlays:
+                path = draw_overlay(self.directory, record, frame.image)
+                if path:
+                    record["overlay"] = os.path.relpath(path, self.directory)
+        index.write(json.dumps(record, default=str) + "\n")
+
+    def _run(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_path, "a") as index:
+            while True:
+                record = self._queue.get()
+                try:
+                    if record is _STOP:
+                        return
+                    self._write(index, record)
+                except Exception:
+                    logger.exception("Session recorder failed to write a record")
+                finally:
+                    if self._queue.empty():
+                        index.flush()
+                    self._queue.task_done()
+
+
+def draw_overlay(directory: str, record: dict, image) -> Optional[str]:
+    """
+    Draws the boxes of a lookup record onto its frame and returns the path,
+    which is named after the frame and the boxes so it is only drawn once.
+    """
+    # Imported here, vision records through this module
+    from phone_agent.tools.vision import plot_bounding_boxes
+
+    found = [
+        bounding_box
+        for bounding_boxes in record["results"].values()
+        for bounding_box in bounding_boxes
+        if "box_2d" in bounding_box
+    ]
+    if not found:
+        return None
+    digest = frame_digest(
+        (record["frame"] + json.dumps(found, sort_keys=True)).encode()
+    )
+    path = os.path.join(directory, "overlays", digest[:2], digest + ".png")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        plot_bounding_boxes(image, found).save(path)
+    return path
+
+
+def record_tool_call(tool, args, tool_context, tool_response):
+    """After-tool callback that records every tool call and its response."""
+    if session_recorder.enabled:
+        session_recorder.record_tool_call(
+            get_device(tool_context), tool.name, args, tool_response
+        )
+    return None
+
+
+def read_index(directory: str, session: Optional[str] = None) -> list[dict]:
+    """The recorded records, optionally of one session only."""
+    with open(os.path.join(directory, "index.jsonl")) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if session:
+        records = [record for record in records if record["session"] == session]
+    return records
+
+
+def render_overlays(directory: str, session: Optional[str] = None) -> list[str]:
+    """Draws the boxes of every recorded lookup onto its frame."""
+    recorder = SessionRecorder(directory, enabled=False)
+    paths = []
+    for record in read_index(directory, session):
+        if record["kind"] != "lookup":
+            continue
+        frame_path = recorder.frame_path(record["frame"], record["mime_type"])
+        with Image.open(frame_path) as image:
+            path = draw_overlay(directory, record, image)
+        if path:
+            paths.append(path)
+    return paths
+
+
+session_recorder = SessionRecorder(
+    config["RECORD_DIR"],
+    enabled=config["RECORD_SESSIONS"],
+    queue_size=config["RECORD_QUEUE_SIZE"],
+    overlays=config["RECORD_OVERLAYS"],
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Draws the recorded lookups onto their frames."
+    )
+    parser.add_argument("directory", nargs="?", default=config["RECORD_DIR"])
+    parser.add_argument("--session", help="only this session")
+    args = parser.parse_args()
+    for path in render_overlays(args.directory, args.session):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
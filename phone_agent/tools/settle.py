@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from phone_agent.tools.device import get_device
+from phone_agent.tools.frames import changed_fraction, thumbnail
+from phone_agent.tools.tracing import span
+
+load_dotenv()
+
+config = {
+    "SETTLE_DETECTION": os.getenv("SETTLE_DETECTION", "false").lower() == "true",
+    # Longest time to wait for the screen to stop changing, in seconds
+    "SETTLE_TIMEOUT": float(os.getenv("SETTLE_TIMEOUT", "2")),
+    "SETTLE_INTERVAL": float(os.getenv("SETTLE_INTERVAL", "0.05")),
+    # Consecutive identical grabs needed to call the screen settled, two lets
+    # a static screen settle after one interval, quicker than the fixed delay
+    "SETTLE_STABLE_FRAMES": int(os.getenv("SETTLE_STABLE_FRAMES", "2")),
+    # Fraction of thumbnail pixels allowed to differ between identical grabs
+    "SETTLE_THRESHOLD": float(os.getenv("SETTLE_THRESHOLD", "0.0005")),
+}
+
+
+@dataclass(frozen=True)
+class SettleResult:
+    settled: bool
+    elapsed: float
+    grabs: int
+
+    def as_dict(self) -> dict:
+        return {"settled": self.settled, "settle_ms": round(self.elapsed * 1000)}
+
+
+async def wait_for_settle(
+    timeout: Optional[float] = None,
+    interval: Optional[float] = None,
+    stable_frames: Optional[int] = None,
+) -> SettleResult:
+    """
+    Polls low-resolution grabs of the current device's mirrored region and
+    returns as soon as consecutive grabs stop changing, or when the timeout
+    runs out.
+    """
+    timeout = config["SETTLE_TIMEOUT"] if timeout is None else timeout
+    interval = config["SETTLE_INTERVAL"] if interval is None else interval
+    stable_frames = stable_frames or config["SETTLE_STABLE_FRAMES"]
+
+    device = get_device()
+    backend = device.backend
+    start = time.monotonic()
+    previous = None
+    stable = 1
+    grabs = 0
+
+    while True:
+        image = await backend.agrab_preview(device.crop_box)
+        current = await asyncio.to_thread(thumbnail, image)
+        grabs += 1
+
+        if previous is not None and previous.shape == current.shape:
+            if changed_fraction(previous, current) <= config["SETTLE_THRESHOLD"]:
+                stable += 1
+            else:
+                stable = 1
+        previous = current
+
+        elapsed = time.monotonic() - start
+        if stable >= stable_frames:
+            return SettleResult(settled=True, elapsed=elapsed, grabs=grabs)
+        if elapsed >= timeout:
+            return SettleResult(settled=False, elapsed=elapsed, grabs=grabs)
+        await asyncio.sleep(interval)
+
+
+async def settle(fixed_delay: float = 0.1) -> dict:
+    """
+    Lets the UI update after an action. Waits for the screen to settle when
+    SETTLE_DETECTION is on, otherwise sleeps for a fixed delay.
+    """
+    if not config["SETTLE_DETECTION"]:
+        await asyncio.sleep(fixed_delay)
+        return {}
+    with span("navigation.settle") as settling:
+        result = await wait_for_settle()
+        settling.attributes.update(settled=result.settled, grabs=result.grabs)
+    return result.as_dict()
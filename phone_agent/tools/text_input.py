@@ -0,0 +1,146 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from phone_agent.tools.device import get_device
+from phone_agent.tools.frames import changed_fraction, thumbnail
+from phone_agent.tools.injection import get_input
+from phone_agent.tools.settle import config as settle_config
+from phone_agent.tools.settle import wait_for_settle
+from phone_agent.tools.tracing import span
+
+load_dotenv()
+
+config = {
+    # auto, type, paste or chunked
+    "TEXT_INPUT_STRATEGY": os.getenv("TEXT_INPUT_STRATEGY", "auto"),
+    # Seconds between keystrokes when typing
+    "TEXT_INPUT_INTERVAL": float(os.getenv("TEXT_INPUT_INTERVAL", "0.02")),
+    "TEXT_INPUT_CHUNK_SIZE": int(os.getenv("TEXT_INPUT_CHUNK_SIZE", "8")),
+}
+
+_PASTE_MODIFIER = "command" if sys.platform == "darwin" else "ctrl"
+
+
+class TextInputError(Exception):
+    """Raised when text could not be entered."""
+
+
+def typeable(text: str) -> bool:
+    """Whether every character has a key that can be pressed."""
+    return all(get_input().is_valid_key(char) for char in text)
+
+
+async def _type(text: str) -> None:
+    if not typeable(text):
+        raise TextInputError(
+            "Text contains characters that can not be typed, use the paste strategy"
+        )
+    # One call with an interval instead of a press and sleep per character
+    await asyncio.to_thread(get_input().write, text, config["TEXT_INPUT_INTERVAL"])
+
+
+async def _run(*command: str, data: Optional[bytes] = None) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate(data)
+    if process.returncode != 0:
+        raise TextInputError(f"{command[0]} failed: {stderr.decode().strip()}")
+    return stdout
+
+
+async def _preview() -> np.ndarray:
+    device = get_device()
+    return thumbnail(await device.backend.agrab_preview(device.crop_box))
+
+
+async def _wait_for_change(before: np.ndarray) -> bool:
+    """
+    Waits until the screen differs from `before` and then for it to settle.
+    False when it did not change within SETTLE_TIMEOUT.
+    """
+    deadline = time.monotonic() + settle_config["SETTLE_TIMEOUT"]
+    while True:
+        if changed_fraction(before, await _preview()) > 0:
+            await wait_for_settle()
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(settle_config["SETTLE_INTERVAL"])
+
+
+async def _paste(text: str) -> None:
+    """
+    Pastes through the clipboard, restoring what was on it once the paste
+    shows on screen. iPhone Mirroring syncs the clipboard asynchronously, so
+    restoring it right away could paste the old contents instead.
+    """
+    try:
+        previous = await _run("pbpaste")
+        await _run("pbcopy", data=text.encode())
+    except FileNotFoundError as e:
+        raise TextInputError(
+            "The paste strategy needs pbcopy/pbpaste. Ensure you are on macOS."
+        ) from e
+
+    try:
+        before = await _preview()
+        await asyncio.to_thread(get_input().hotkey, _PASTE_MODIFIER, "v")
+        landed = await _wait_for_change(before)
+    finally:
+        await _run("pbcopy", data=previous)
+    if not landed:
+        raise TextInputError("The screen did not change after pasting")
+
+
+async def _chunked(text: str) -> None:
+    """
+    Types the text in chunks and waits for the screen to change after each
+    one, so dropped keystrokes surface as an error instead of silently
+    missing characters. A chunk is never typed again: on a slow render that
+    would enter it twice.
+    """
+    size = config["TEXT_INPUT_CHUNK_SIZE"]
+
+    for start in range(0, len(text), size):
+        chunk = text[start : start + size]
+        before = await _preview()
+        await _type(chunk)
+        if not await _wait_for_change(before):
+            raise TextInputError(
+                f"The screen did not change after typing characters {start} to "
+                f"{start + len(chunk)}, check the field: the first {start} "
+                "were entered"
+            )
+
+
+STRATEGIES = {"type": _type, "paste": _paste, "chunked": _chunked}
+
+
+async def enter_text(text: str, strategy: Optional[str] = None) -> dict:
+    """
+    Enters text into the focused field and reports how long it took. The auto
+    strategy types when every character has a key, and pastes otherwise.
+    """
+    strategy = strategy or config["TEXT_INPUT_STRATEGY"]
+    if strategy == "auto":
+        strategy = "type" if typeable(text) else "paste"
+    if strategy not in STRATEGIES:
+        raise TextInputError(f"Unknown text input strategy: {strategy}")
+
+    start = time.monotonic()
+    with span("navigation.enter_text", strategy=strategy, characters=len(text)):
+        await STRATEGIES[strategy](text)
+    return {
+        "strategy": strategy,
+        "entry_ms": round((time.monotonic() - start) * 1000),
+    }
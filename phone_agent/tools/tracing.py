@@ -0,0 +1,320 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+config = {
+    "TRACE_JSONL_PATH": os.getenv("TRACE_JSONL_PATH"),
+    "TRACE_OTEL": os.getenv("TRACE_OTEL", "false").lower() == "true",
+    # Spans kept in memory per session for the summary report
+    "TRACE_MAX_SPANS": int(os.getenv("TRACE_MAX_SPANS", "10000")),
+}
+
+current_session: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_session", default="default"
+)
+
+
+@dataclass
+class Span:
+    name: str
+    session: str
+    start: float
+    duration_ms: float = 0.0
+    attributes: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "type": "span",
+            "name": self.name,
+            "session": self.session,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+def nearest_rank(values: list[float], quantile: float) -> float:
+    """The nearest-rank percentile of already sorted values."""
+    return values[max(math.ceil(quantile * len(values)) - 1, 0)]
+
+
+def usage_attributes(usage_metadata) -> dict:
+    """Token counts from a Gemini response's usage_metadata."""
+    if usage_metadata is None:
+        return {}
+    attributes = {
+        "prompt_tokens": usage_metadata.prompt_token_count,
+        "output_tokens": usage_metadata.candidates_token_count,
+        "cached_tokens": usage_metadata.cached_content_token_count,
+        "total_tokens": usage_metadata.total_token_count,
+    }
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+class JsonlExporter:
+    """Appends every span as one JSON line."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, record: dict) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+
+class OpenTelemetryExporter:
+    """
+    Re-emits spans through the OpenTelemetry API, so whatever SDK and exporter
+    the process configured (OTLP, console, ...) receives them.
+    """
+
+    def __init__(self):
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "TRACE_OTEL requires the optional 'opentelemetry-api' package: "
+                "uv sync --extra tracing"
+            ) from e
+        self._tracer = trace.get_tracer("phone_agent")
+
+    def export(self, record: dict) -> None:
+        if record["type"] != "span":
+            return
+        start_ns = int(record["start"] * 1e9)
+        end_ns = start_ns + int(record["duration_ms"] * 1e6)
+        attributes = {
+            key: value
+            for key, value in record["attributes"].items()
+            if isinstance(value, (str, bool, int, float))
+        }
+        attributes["session"] = record["session"]
+        span = self._tracer.start_span(
+            record["name"], start_time=start_ns, attributes=attributes
+        )
+        span.end(end_time=end_ns)
+
+
+class Tracer:
+    """Records timed spans per session and hands them to the exporters."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self.exporters = []
+        self._lock = threading.Lock()
+        self._spans: dict[str, deque[Span]] = defaultdict(
+            lambda: deque(maxlen=self.max_spans)
+        )
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Times the block. Attributes can be added to the yielded span."""
+        span = Span(
+            name=name,
+            session=current_session.get(),
+            start=time.time(),
+            attributes=attributes,
+        )
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            self.record(span)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self._spans[span.session].append(span)
+        self._export(span.as_dict())
+
+    def _export(self, record: dict) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(record)
+            except Exception:
+                logger.exception("Trace exporter %s failed", exporter)
+
+    def traced(self, func):
+        """Wraps a tool so every call is recorded as a `tool.<name>` span."""
+        name = f"tool.{func.__name__}"
+
+        def annotate(span: Span, result) -> None:
+            if isinstance(result, dict) and "status" in result:
+                span.attributes["status"] = result["status"]
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with self.span(name) as span:
+                    result = await func(*args, **kwargs)
+                    annotate(span, result)
+                    return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(name) as span:
+                result = func(*args, **kwargs)
+                annotate(span, result)
+                return result
+
+        return wrapper
+
+    def summary(self, session: Optional[str] = None) -> dict:
+        """Per span name: count, duration percentiles, bytes and token totals."""
+        session = session or current_session.get()
+        with self._lock:
+            spans = list(self._spans.get(session, ()))
+
+        grouped = defaultdict(list)
+        for span in spans:
+            grouped[span.name].append(span)
+
+        summary = {}
+        for name, group in sorted(grouped.items()):
+            durations = sorted(span.duration_ms for span in group)
+            entry = {
+                "count": len(group),
+                "total_ms": round(sum(durations), 1),
+                "mean_ms": round(statistics.mean(durations), 1),
+                "p50_ms": round(nearest_rank(durations, 0.5), 1),
+                "p95_ms": round(nearest_rank(durations, 0.95), 1),
+                "max_ms": round(durations[-1], 1),
+            }
+            for key in ("bytes", "prompt_tokens", "output_tokens", "cached_tokens"):
+                values = [
+                    span.attributes[key] for span in group if key in span.attributes
+                ]
+                if values:
+                    entry[key] = sum(values)
+            summary[name] = entry
+        return summary
+
+    def report(self, session: Optional[str] = None) -> str:
+        """The session summary as a text table, slowest total first."""
+        summary = self.summary(session)
+        lines = [
+            f"{'span':<36}{'count':>7}{'total ms':>11}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'tokens in':>11}{'tokens out':>12}"
+        ]
+        for name, entry in sorted(
+            summary.items(), key=lambda item: item[1]["total_ms"], reverse=True
+        ):
+            lines.append(
+                f"{name:<36}{entry['count']:>7}{entry['total_ms']:>11.0f}"
+                f"{entry['p50_ms']:>9.0f}{entry['p95_ms']:>9.0f}"
+                f"{entry.get('prompt_tokens', ''):>11}"
+                f"{entry.get('output_tokens', ''):>12}"
+            )
+        return "\n".join(lines)
+
+    def end_session(self, session: Optional[str] = None) -> dict:
+        """Exports and logs the session summary and drops its spans."""
+        session = session or current_session.get()
+        summary = self.summary(session)
+        self._export({"type": "summary", "session": session, "spans": summary})
+        logger.info("Trace summary for session %s\n%s", session, self.report(session))
+        with self._lock:
+            self._spans.pop(session, None)
+        return summary
+
+
+def session_id(context) -> str:
+    """The ADK session a callback or tool context belongs to."""
+    session = getattr(context, "session", None)
+    return session.id if session is not None else context.invocation_id
+
+
+_model_request: contextvars.ContextVar[Optional[tuple[float, float, int]]] = (
+    contextvars.ContextVar("model_request", default=None)
+)
+
+
+def trace_before_model(callback):
+    """
+    Wraps a before-model callback: binds the session for the spans that follow,
+    times the callback itself and starts timing the agent's model call.
+    """
+
+    @functools.wraps(callback)
+    def wrapper(callback_context, llm_request):
+        current_session.set(session_id(callback_context))
+        with tracer.span(f"callback.{callback.__name__}"):
+            response = callback(callback_context, llm_request)
+
+        request_bytes = sum(
+            len(part.inline_data.data)
+            for content in llm_request.contents or []
+            for part in content.parts or []
+            if part.inline_data and part.inline_data.data
+        )
+        _model_request.set((time.time(), time.perf_counter(), request_bytes))
+        return response
+
+    return wrapper
+
+
+def trace_after_model(callback_context, llm_response):
+    """After-model callback recording the agent's model call and its tokens."""
+    request = _model_request.get()
+    if request is None:
+        return None
+    _model_request.set(None)
+
+    started_at, start, request_bytes = request
+    tracer.record(
+        Span(
+            name="agent.generate_content",
+            session=session_id(callback_context),
+            start=started_at,
+            duration_ms=(time.perf_counter() - start) * 1000,
+            attributes={
+                "bytes": request_bytes,
+                **usage_attributes(getattr(llm_response, "usage_metadata", None)),
+            },
+        )
+    )
+    return None
+
+
+def trace_after_agent(callback_context):
+    """After-agent callback that reports and closes the session's trace."""
+    tracer.end_session(session_id(callback_context))
+    return None
+
+
+tracer = Tracer(max_spans=config["TRACE_MAX_SPANS"])
+if config["TRACE_JSONL_PATH"]:
+    tracer.exporters.append(JsonlExporter(config["TRACE_JSONL_PATH"]))
+if config["TRACE_OTEL"]:
+    tracer.exporters.append(OpenTelemetryExporter())
+
+span = tracer.span
+traced = tracer.traced
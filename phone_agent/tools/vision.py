@@ -1,37 +1,69 @@
-import io
+import asyncio
+import contextlib
 import json
 import os
-import subprocess  # nosec
-from io import BytesIO
 from typing import Optional
 
-import jinja2
 from dotenv import load_dotenv
-from google import genai
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest, LlmResponse
-from google.genai import types
+from google.adk.tools import ToolContext
+from google.genai import errors, types
 from PIL import Image, ImageColor, ImageDraw
 
-load_dotenv()
+from phone_agent.templates import prompt_registry
+from phone_agent.tools.boxes import (
+    clean_boxes,
+    crop_region,
+    from_region,
+    region_around,
+    tiles,
+    to_pixels,
+    to_screen,
+)
+from phone_agent.tools.cache import locate_cache, normalize_query
+from phone_agent.tools.capture import CaptureError
+from phone_agent.tools.context_cache import cache_missing, context_cache
+from phone_agent.tools.detector import config as detector_config
+from phone_agent.tools.detector import local_detector
+from phone_agent.tools.device import DeviceContext, get_device
+from phone_agent.tools.encoding import (
+    EncodingProfile,
+    encode,
+    vision_coarse_profile,
+    vision_profile,
+)
+from phone_agent.tools.gemini import gemini_client
+from phone_agent.tools.jsonstream import JSONArrayStream
+from phone_agent.tools.memory import navigation_memory
+from phone_agent.tools.prefetch import prefetcher
+from phone_agent.tools.recorder import session_recorder
+from phone_agent.tools.tracing import span, usage_attributes
 
-client = genai.Client(vertexai=True)
+load_dotenv()
 
 additional_colors = [colorname for (colorname, _) in ImageColor.colormap.items()]
 
 config = {
-    "SCREENSHOT_LOCATION": os.getenv("SCREENSHOT_LOCATION"),
     "GEMINI_PRO_MODEL": os.getenv("GEMINI_PRO_MODEL"),
-    "IMAGE_CROP_BOX": tuple(map(int, os.getenv("IMAGE_CROP_BOX").split(","))),
-    "MIRRORING_X_BOUND": int(os.getenv("MIRRORING_X_BOUND")),
-    "MIRRORING_Y_BOUND": int(os.getenv("MIRRORING_Y_BOUND")),
-    "SCREEN_Y_INVERSION": int(os.getenv("SCREEN_Y_INVERSION")),
-    "CONVERSION_WIDTH": int(os.getenv("CONVERSION_WIDTH")),
-    "CONVERSION_HEIGHT": int(os.getenv("CONVERSION_HEIGHT")),
+    # Constrain responses to a JSON array of boxes instead of asking nicely
+    "VISION_RESPONSE_SCHEMA": os.getenv("VISION_RESPONSE_SCHEMA", "true").lower()
+    == "true",
+    # Overlap above which a later box for the same query counts as a duplicate
+    "VISION_NMS_THRESHOLD": float(os.getenv("VISION_NMS_THRESHOLD", "0.5")),
+    # Stream locate_UI_elements responses and stop at the first matching box
+    "VISION_STREAMING": os.getenv("VISION_STREAMING", "false").lower() == "true",
+    # off, refine (coarse pass, then a full resolution crop) or tile
+    "VISION_ZOOM_MODE": os.getenv("VISION_ZOOM_MODE", "off").lower(),
+    # Grid units (of 1000) added around the coarse boxes, and the smallest crop
+    "VISION_ZOOM_MARGIN": float(os.getenv("VISION_ZOOM_MARGIN", "60")),
+    "VISION_ZOOM_MIN_SIZE": float(os.getenv("VISION_ZOOM_MIN_SIZE", "250")),
+    "VISION_TILE_ROWS": int(os.getenv("VISION_TILE_ROWS", "2")),
+    "VISION_TILE_COLS": int(os.getenv("VISION_TILE_COLS", "2")),
+    # Fraction of a tile's size it overlaps its neighbours by
+    "VISION_TILE_OVERLAP": float(os.getenv("VISION_TILE_OVERLAP", "0.1")),
 }
 
-os.makedirs(os.path.dirname(config["SCREENSHOT_LOCATION"]), exist_ok=True)
-
 
 def parse_json(json_output: str):
     # Parsing out the markdown fencing
@@ -48,19 +80,21 @@ def parse_json(json_output: str):
     return json_output
 
 
-def plot_bounding_boxes(im, bounding_boxes):
+def plot_bounding_boxes(im: Image.Image, bounding_boxes) -> Image.Image:
     """
     Plots bounding boxes on an image with markers for each a name, using PIL,
     normalized coordinates, and different colors.
 
     Args:
-        img_path: The path to the image file.
+        im: The image to annotate. It is copied, never drawn on directly.
         bounding_boxes: A list of bounding boxes containing the name of the object
          and their positions in normalized [y1 x1 y2 x2] format.
+
+    Returns:
+        The annotated copy of the image.
     """
 
-    # Load the image
-    img = Image.open(BytesIO(open(im, "rb").read()))
+    img = im.copy()
 
     width, height = img.size
 
@@ -96,23 +130,16 @@ def plot_bounding_boxes(im, bounding_boxes):
 
     # font = ImageFont.truetype("NotoSansCJK-Regular.ttc", size=14)
 
+    # Convert normalized coordinates to absolute coordinates, corners ordered
+    pixels = to_pixels(bounding_boxes, width, height)
+
     # Iterate over the bounding boxes
-    for i, bounding_box in enumerate(bounding_boxes):
+    for i, (bounding_box, (abs_x1, abs_y1, abs_x2, abs_y2)) in enumerate(
+        zip(bounding_boxes, pixels.tolist())
+    ):
         # Select a color from the list
         color = colors[i % len(colors)]
 
-        # Convert normalized coordinates to absolute coordinates
-        abs_y1 = int(bounding_box["box_2d"][0] / 1000 * height)
-        abs_x1 = int(bounding_box["box_2d"][1] / 1000 * width)
-        abs_y2 = int(bounding_box["box_2d"][2] / 1000 * height)
-        abs_x2 = int(bounding_box["box_2d"][3] / 1000 * width)
-
-        if abs_x1 > abs_x2:
-            abs_x1, abs_x2 = abs_x2, abs_x1
-
-        if abs_y1 > abs_y2:
-            abs_y1, abs_y2 = abs_y2, abs_y1
-
         # Draw the bounding box
         draw.rectangle(((abs_x1, abs_y1), (abs_x2, abs_y2)), outline=color, width=4)
 
@@ -120,52 +147,129 @@ def plot_bounding_boxes(im, bounding_boxes):
         if "label" in bounding_box:
             draw.text((abs_x1 + 8, abs_y1 + 6), bounding_box["label"], fill=color)
 
-    # Display the image
-    img.save(im.replace(".png", "_analyzed.png"))
+    return img
+
+
+SAFETY_SETTINGS = [
+    types.SafetySetting(
+        category="HARM_CATEGORY_DANGEROUS_CONTENT",
+        threshold="BLOCK_ONLY_HIGH",
+    ),
+]
 
 
-def get_instructions() -> str:
-    # Point the loader to the parent directory containing the 'prompts' folder
-    prompts_dir = os.path.join(os.path.dirname(__file__), "..", "prompts")
-    env = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(prompts_dir),
-        autoescape=jinja2.select_autoescape(),
+def get_instructions(batch: bool = False) -> str:
+    return prompt_registry.render(
+        "vision.j2", batch=batch, schema=config["VISION_RESPONSE_SCHEMA"]
     )
-    # Load the template directly by its name within the prompts directory
-    template = env.get_template("vision.j2")
-    return template.render()
 
 
-def gemini_spatial_understanding(image, query) -> list[dict]:
-    """github/google-gemini/cookbook/Spatial_understanding.ipynb"""
-    safety_settings = [
-        types.SafetySetting(
-            category="HARM_CATEGORY_DANGEROUS_CONTENT",
-            threshold="BLOCK_ONLY_HIGH",
+def response_schema(batch: bool = False) -> types.Schema:
+    """A JSON array of labeled boxes, each with its query index when batched."""
+    properties = {
+        "box_2d": types.Schema(
+            type=types.Type.ARRAY,
+            items=types.Schema(type=types.Type.INTEGER),
+            min_items=4,
+            max_items=4,
         ),
-    ]
+        "label": types.Schema(type=types.Type.STRING),
+    }
+    if batch:
+        properties["query"] = types.Schema(type=types.Type.INTEGER)
+    return types.Schema(
+        type=types.Type.ARRAY,
+        items=types.Schema(
+            type=types.Type.OBJECT,
+            properties=properties,
+            required=list(properties),
+            property_ordering=list(properties),
+        ),
+    )
+
 
-    # Load and resize image
-    im = Image.open(BytesIO(open(image, "rb").read()))
-    im.thumbnail(
-        [config["CONVERSION_WIDTH"], config["CONVERSION_HEIGHT"]],
-        Image.Resampling.LANCZOS,
+# Built once per batch value, generation_config runs on every vision call
+SCHEMA_SETTINGS = {
+    batch: {
+        "response_mime_type": "application/json",
+        "response_schema": response_schema(batch),
+    }
+    for batch in (False, True)
+}
+
+
+def generation_config(batch: bool = False) -> types.GenerateContentConfig:
+    """The shared, read-only config of spatial understanding requests."""
+    settings = SCHEMA_SETTINGS[batch] if config["VISION_RESPONSE_SCHEMA"] else {}
+    return prompt_registry.generation_config(
+        "vision.j2",
+        {"batch": batch, "schema": config["VISION_RESPONSE_SCHEMA"]},
+        temperature=0.5,
+        safety_settings=SAFETY_SETTINGS,
+        **settings,
     )
 
-    # Run model to find bounding boxes
-    response = client.models.generate_content(
-        model=config["GEMINI_PRO_MODEL"],
-        contents=[
-            "Here is what you should focus on: " + query,
-            im,
-        ],
-        config=types.GenerateContentConfig(
-            system_instruction=get_instructions(),
-            temperature=0.5,
-            safety_settings=safety_settings,
-        ),
+
+def _clean(bounding_boxes: list, batch: bool = False) -> list[dict]:
+    """Drops malformed and duplicate boxes, duplicates only per query."""
+    with span("vision.clean_boxes", boxes=len(bounding_boxes)) as clean:
+        cleaned, duplicates = clean_boxes(
+            bounding_boxes,
+            config["VISION_NMS_THRESHOLD"],
+            group="query" if batch else None,
+        )
+        clean.attributes.update(
+            duplicates=duplicates,
+            malformed=len(bounding_boxes) - len(cleaned) - duplicates,
+        )
+    return cleaned
+
+
+async def _generate_content(contents: list, batch: bool = False):
+    """
+    Sends a spatial understanding request, with the instruction taken from
+    the context cache when it is cached. When the service no longer knows
+    the cache, it is dropped and the request is sent again uncached, any
+    other error is raised as is.
+    """
+    uncached = generation_config(batch=batch)
+    cached = await context_cache.apply(config["GEMINI_PRO_MODEL"], uncached)
+    try:
+        return await gemini_client.generate_content(
+            model=config["GEMINI_PRO_MODEL"], contents=contents, config=cached
+        )
+    except errors.ClientError as e:
+        if cached is uncached or not cache_missing(e):
+            raise
+        context_cache.invalidate(cached.cached_content)
+    return await gemini_client.generate_content(
+        model=config["GEMINI_PRO_MODEL"], contents=contents, config=uncached
     )
 
+
+async def _request_bounding_boxes(
+    image: Image.Image,
+    prompt: str,
+    batch: bool = False,
+    profile: EncodingProfile = vision_profile,
+) -> list[dict]:
+    """Sends one frame and prompt to Gemini and parses the returned JSON array."""
+    # Resize and encode off the event loop, the frame store keeps the original
+    with span("vision.encode"):
+        data, mime_type = await asyncio.to_thread(encode, image, profile)
+
+    # Run model to find bounding boxes, retried and rate limited by the client
+    try:
+        with span("vision.generate_content", bytes=len(data), batch=batch) as request:
+            response = await _generate_content(
+                [prompt, types.Part.from_bytes(data=data, mime_type=mime_type)],
+                batch,
+            )
+            request.attributes.update(usage_attributes(response.usage_metadata))
+    except Exception as e:
+        return [{"status": "error", "message": f"Gemini request failed: {e}"}]
+
+    session_recorder.record_vision(prompt, response.text, batch=batch)
     string = parse_json(response.text)
 
     try:
@@ -179,9 +283,20 @@ def gemini_spatial_understanding(image, query) -> list[dict]:
             }
         ]
 
-    try:
-        bounding_boxes[0]["box_2d"]
-    except KeyError:
+    if bounding_boxes == []:
+        return [{"status": "warning", "message": "No relevant objects found"}]
+
+    if (
+        isinstance(bounding_boxes, list)
+        and isinstance(bounding_boxes[0], dict)
+        and bounding_boxes[0].get("status") == "warning"
+    ):
+        return bounding_boxes
+
+    bounding_boxes = (
+        _clean(bounding_boxes, batch) if isinstance(bounding_boxes, list) else []
+    )
+    if not bounding_boxes:
         return [
             {
                 "status": "error",
@@ -192,7 +307,216 @@ def gemini_spatial_understanding(image, query) -> list[dict]:
     return bounding_boxes
 
 
-def take_screenshot(explanation: str) -> dict:
+def label_matches(label: str, query: str) -> bool:
+    """
+    Whether the box label has every word of the query. Not the other way
+    around: a generic label like "icon" is not the "settings gear icon".
+    """
+    query_words = set(normalize_query(query).split())
+    return bool(query_words) and query_words <= set(normalize_query(label).split())
+
+
+async def _stream_bounding_boxes(
+    image: Image.Image, query: str, profile: EncodingProfile = vision_profile
+) -> list[dict]:
+    """
+    Streams the JSON array of boxes for one query and stops reading, which
+    cancels the rest of the response, at the first box whose label matches
+    the query. Without a match every box is returned, as when not streaming.
+    """
+    with span("vision.encode"):
+        data, mime_type = await asyncio.to_thread(encode, image, profile)
+
+    prompt = "Here is what you should focus on: " + query
+    request_config = await context_cache.apply(
+        config["GEMINI_PRO_MODEL"], generation_config()
+    )
+    parser = JSONArrayStream()
+    bounding_boxes = []
+    try:
+        with span("vision.generate_content_stream", bytes=len(data)) as request:
+            stream = gemini_client.generate_content_stream(
+                model=config["GEMINI_PRO_MODEL"],
+                contents=[
+                    prompt,
+                    types.Part.from_bytes(data=data, mime_type=mime_type),
+                ],
+                config=request_config,
+            )
+            async with contextlib.aclosing(stream):
+                async for chunk in stream:
+                    if chunk.usage_metadata:
+                        request.attributes.update(
+                            usage_attributes(chunk.usage_metadata)
+                        )
+                    for element in parser.feed(chunk.text or ""):
+                        if not isinstance(element, dict):
+                            continue
+                        if element.get("status") == "warning":
+                            return [element]
+                        if "box_2d" not in element:
+                            continue
+                        bounding_boxes.append(element)
+                        if label_matches(element.get("label", ""), query):
+                            matched = _clean([element])
+                            if matched:
+                                request.attributes["early_return"] = not parser.complete
+                                return matched
+    except json.JSONDecodeError as e:
+        return [
+            {
+                "status": "error",
+                "message": f"""Failed to parse bounding boxes JSON: {e}.
+            Raw output: {parser.text}""",
+            }
+        ]
+    except Exception as e:
+        if cache_missing(e):
+            # A stream can't be sent again, the next request gets a new cache
+            context_cache.invalidate(request_config.cached_content)
+        return [{"status": "error", "message": f"Gemini request failed: {e}"}]
+    finally:
+        # Only the part read before stopping
+        session_recorder.record_vision(prompt, parser.text, streamed=True)
+
+    bounding_boxes = _clean(bounding_boxes) if bounding_boxes else []
+    if bounding_boxes:
+        return bounding_boxes
+    if parser.complete and parser.count == 0:
+        return [{"status": "warning", "message": "No relevant objects found"}]
+    return [
+        {
+            "status": "error",
+            "message": f"No bounding boxes found. Raw response: {parser.text}",
+        }
+    ]
+
+
+def _found(bounding_boxes: list[dict]) -> bool:
+    return "box_2d" in bounding_boxes[0]
+
+
+async def _single_pass(
+    image: Image.Image, query: str, profile: EncodingProfile = vision_profile
+) -> list[dict]:
+    if config["VISION_STREAMING"]:
+        return await _stream_bounding_boxes(image, query, profile)
+    return await _request_bounding_boxes(
+        image, "Here is what you should focus on: " + query, profile=profile
+    )
+
+
+async def _tiled_bounding_boxes(
+    image: Image.Image, prompt: str, batch: bool = False
+) -> list[dict]:
+    """
+    Looks for the elements in overlapping tiles of the frame at once, each at
+    the resolution the whole frame would be shrunk to, and maps the boxes
+    back. An element in the overlap is found twice and de-duplicated.
+    """
+    regions = tiles(
+        config["VISION_TILE_ROWS"],
+        config["VISION_TILE_COLS"],
+        config["VISION_TILE_OVERLAP"],
+    )
+    with span("vision.tile", tiles=len(regions)):
+        results = await asyncio.gather(
+            *(
+                _request_bounding_boxes(crop_region(image, region), prompt, batch)
+                for region in regions
+            )
+        )
+
+    found = [
+        bounding_box
+        for region, bounding_boxes in zip(regions, results)
+        if _found(bounding_boxes)
+        for bounding_box in from_region(bounding_boxes, region)
+    ]
+    if found:
+        return _clean(found, batch)
+    failures = [
+        bounding_boxes
+        for bounding_boxes in results
+        if bounding_boxes[0].get("status") == "error"
+    ]
+    if failures:
+        return failures[0]
+    return [{"status": "warning", "message": "No relevant objects found"}]
+
+
+async def _zoomed_bounding_boxes(image: Image.Image, query: str) -> list[dict]:
+    """
+    Finds the candidates on a small version of the frame first, then asks
+    again on a full resolution crop around them and maps the boxes back.
+    When the coarse pass finds nothing, the element may be too small to see
+    at that size, so the frame is searched in tiles instead.
+    """
+    coarse = await _single_pass(image, query, vision_coarse_profile)
+    if coarse[0].get("status") == "error":
+        return coarse
+    if not _found(coarse):
+        return await _tiled_bounding_boxes(
+            image, "Here is what you should focus on: " + query
+        )
+
+    region = region_around(
+        coarse, config["VISION_ZOOM_MARGIN"], config["VISION_ZOOM_MIN_SIZE"]
+    )
+    with span("vision.zoom", region=[round(v) for v in region]) as zoom:
+        fine = await _single_pass(crop_region(image, region), query)
+        zoom.attributes["refined"] = _found(fine)
+    # The crop may have cut the element off, the coarse boxes are still valid
+    return from_region(fine, region) if _found(fine) else coarse
+
+
+async def gemini_spatial_understanding(image: Image.Image, query: str) -> list[dict]:
+    """github/google-gemini/cookbook/Spatial_understanding.ipynb"""
+    if config["VISION_ZOOM_MODE"] == "refine":
+        return await _zoomed_bounding_boxes(image, query)
+    if config["VISION_ZOOM_MODE"] == "tile":
+        return await _tiled_bounding_boxes(
+            image, "Here is what you should focus on: " + query
+        )
+    return await _single_pass(image, query)
+
+
+async def gemini_batch_spatial_understanding(
+    image: Image.Image, queries: list[str]
+) -> dict[str, list[dict]]:
+    """
+    Locates the elements for several queries in a single Gemini call.
+
+    Every returned box carries the index of the query it answers, so the
+    result can be grouped by query. Queries without a box get a warning.
+    """
+    prompt = "Here is what you should focus on:\n" + "\n".join(
+        f"{i}: {query}" for i, query in enumerate(queries)
+    )
+    if config["VISION_ZOOM_MODE"] == "tile":
+        bounding_boxes = await _tiled_bounding_boxes(image, prompt, batch=True)
+    else:
+        bounding_boxes = await _request_bounding_boxes(image, prompt, batch=True)
+
+    if bounding_boxes[0].get("status") == "error":
+        return {query: bounding_boxes for query in queries}
+
+    grouped = {query: [] for query in queries}
+    for bounding_box in bounding_boxes:
+        index = bounding_box.pop("query", None)
+        if "box_2d" in bounding_box and isinstance(index, int):
+            if 0 <= index < len(queries):
+                grouped[queries[index]].append(bounding_box)
+
+    not_found = {"status": "warning", "message": "No relevant objects found"}
+    return {
+        query: boxes if boxes else [dict(not_found)] for query, boxes in grouped.items()
+    }
+
+
+async def take_screenshot(
+    explanation: str, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Captures a screenshot of the current iPhone screen and returns it as image
     data. This is crucial for verifying the current UI state before planning
@@ -204,37 +528,34 @@ def take_screenshot(explanation: str) -> dict:
     Returns:
         dict: The outcome of the screenshot process.
     """
-    os.makedirs(os.path.dirname(config["SCREENSHOT_LOCATION"]), exist_ok=True)
-    screenshot_path = config["SCREENSHOT_LOCATION"]
-    if os.path.exists(screenshot_path):
-        os.remove(screenshot_path)
+    device = get_device(tool_context)
 
     try:
-        subprocess.run(  # nosec
-            ["screencapture", "-C", screenshot_path],
-            check=True,
-            capture_output=True,
-            text=True,
+        pil_cropped_img = await prefetcher.take()
+        if pil_cropped_img is None:
+            backend = device.backend
+            with span("capture.grab", backend=backend.name):
+                pil_cropped_img = await backend.agrab(device.crop_box)
+
+        # Hashing and PNG encoding are CPU bound, keep them off the event loop
+        with span("frame.put") as put:
+            frame = await asyncio.to_thread(device.frame_store.put, pil_cropped_img)
+            put.attributes.update(bytes=len(frame.data), changed=frame.changed)
+        # Every NAVIGATION_MEMORY_SAVE_EVERY transitions this writes the graph
+        await asyncio.to_thread(
+            navigation_memory.record_frame, device, frame.fingerprint
         )
+        session_recorder.record_frame(device, frame)
 
-        # Crop the image using PIL
-        with Image.open(screenshot_path) as img:
-            left_quarter_box = config["IMAGE_CROP_BOX"]
-            pil_cropped_img = img.crop(left_quarter_box)
-            pil_cropped_img.save(screenshot_path)
-
+        if not frame.changed:
+            return {
+                "status": "screen unchanged",
+                "message": "The screen has not changed since the last screenshot.",
+            }
         return {"status": "screenshot captured"}
 
-    except subprocess.CalledProcessError as e:
+    except CaptureError as e:
         return {"status": "error", "message": f"Error capturing screen: {str(e)}"}
-    except FileNotFoundError as e:
-        return {
-            "status": "error",
-            "message": (
-                "Error: 'screencapture' command not found. Ensure you are on macOS. "
-                f"Error: {e}"
-            ),
-        }
     except Exception as e:
         return {
             "status": "error",
@@ -242,7 +563,16 @@ def take_screenshot(explanation: str) -> dict:
         }
 
 
-def locate_UI_elements(explanation: str, query: str) -> dict:
+async def _detect_locally(image: Image.Image, query: str) -> Optional[list[dict]]:
+    """Tries the template matcher first, None means ask Gemini instead."""
+    if not detector_config["LOCAL_DETECTOR"]:
+        return None
+    return await asyncio.to_thread(local_detector.detect, image, query)
+
+
+async def locate_UI_elements(
+    explanation: str, query: str, tool_context: Optional[ToolContext] = None
+) -> dict:
     """
     Analyzes the latest screenshot to locate specific UI elements described by
     the query. Returns a list of found elements, including their center coordinates
@@ -257,17 +587,33 @@ def locate_UI_elements(explanation: str, query: str) -> dict:
     Returns:
         dict: The outcome of the object location process.
     """
-    bounding_boxes = gemini_spatial_understanding(config["SCREENSHOT_LOCATION"], query)
+    device = get_device(tool_context)
+    frame = device.frame_store.latest()
+    if frame is None:
+        return {
+            "status": "error",
+            "message": "No screenshot available. Use `take_screenshot` first.",
+        }
 
-    if bounding_boxes[0].get("status", None) and (
-        bounding_boxes[0].get("status") == "warning"
-        or bounding_boxes[0].get("status") == "error"
-    ):
-        return bounding_boxes[0]
+    bounding_boxes = locate_cache.get(frame.fingerprint, query)
+    if bounding_boxes is None:
+        bounding_boxes = await _detect_locally(frame.image, query)
+        if bounding_boxes is None:
+            bounding_boxes = await gemini_spatial_understanding(frame.image, query)
+
+            if bounding_boxes[0].get("status", None) and (
+                bounding_boxes[0].get("status") == "warning"
+                or bounding_boxes[0].get("status") == "error"
+            ):
+                return bounding_boxes[0]
 
-    plot_bounding_boxes(config["SCREENSHOT_LOCATION"], bounding_boxes)
+        # Persisting the cache writes to disk
+        await asyncio.to_thread(
+            locate_cache.put, frame.fingerprint, query, bounding_boxes
+        )
 
-    bounding_boxes = convert_coordinates(bounding_boxes)
+    session_recorder.record_lookup(device, frame, [query], {query: bounding_boxes})
+    bounding_boxes = convert_coordinates(bounding_boxes, device)
 
     return {
         "status": "localization process completed",
@@ -275,28 +621,78 @@ def locate_UI_elements(explanation: str, query: str) -> dict:
     }
 
 
-def convert_coordinates(bounding_boxes: list[dict]) -> list[dict]:
-    """Convert the bounding boxes to clickable coordinates."""
-    height, width = 1000, 1000  # Gemini returns coordinates in 1000x1000 pixels
-    x_bound, y_bound = config["MIRRORING_X_BOUND"], config["MIRRORING_Y_BOUND"]
+async def locate_multiple_UI_elements(
+    explanation: str, queries: list[str], tool_context: Optional[ToolContext] = None
+) -> dict:
+    """
+    Analyzes the latest screenshot to locate several UI elements at once, for
+    example a username field, a password field and a login button. Prefer this
+    over calling `locate_UI_elements` repeatedly on the same screen. Returns the
+    found elements per query, including their center coordinates (x, y).
 
-    for bounding_box in bounding_boxes:
-        x_center = int(
-            (
-                int(bounding_box["box_2d"][1] / width * x_bound)
-                + int(bounding_box["box_2d"][3] / width * x_bound)
-            )
-            / 2
-        )
+    Args:
+        explanation (str): One sentence explanation as to why this tool is being used, and how it contributes to the goal.
+        queries (list[str]): Natural language descriptions of the UI elements to
+          locate, one element per query (e.g., ['the text field labeled
+          username', 'the text field labeled password', 'the login button']).
+
+    Returns:
+        dict: The outcome of the object location process, grouped by query.
+    """
+    device = get_device(tool_context)
+    frame = device.frame_store.latest()
+    if frame is None:
+        return {
+            "status": "error",
+            "message": "No screenshot available. Use `take_screenshot` first.",
+        }
 
-        y_center = int(
-            (
-                int((height - bounding_box["box_2d"][0]) / height * y_bound)
-                + int((height - bounding_box["box_2d"][2]) / height * y_bound)
+    results = {}
+    for query in queries:
+        cached = locate_cache.get(frame.fingerprint, query)
+        if cached is None:
+            cached = await _detect_locally(frame.image, query)
+            if cached is not None:
+                await asyncio.to_thread(
+                    locate_cache.put, frame.fingerprint, query, cached
+                )
+        if cached is not None:
+            results[query] = cached
+
+    missing = [query for query in dict.fromkeys(queries) if query not in results]
+    if missing:
+        located = await gemini_batch_spatial_understanding(frame.image, missing)
+        for query, bounding_boxes in located.items():
+            if bounding_boxes[0].get("status") not in ("warning", "error"):
+                await asyncio.to_thread(
+                    locate_cache.put, frame.fingerprint, query, bounding_boxes
+                )
+            results[query] = bounding_boxes
+
+    session_recorder.record_lookup(device, frame, queries, results)
+
+    return {
+        "status": "localization process completed",
+        "results": {
+            query: (
+                bounding_boxes[0]
+                if bounding_boxes[0].get("status") in ("warning", "error")
+                else convert_coordinates(bounding_boxes, device)
             )
-            / 2
-        )
+            for query, bounding_boxes in results.items()
+        },
+    }
+
+
+def convert_coordinates(
+    bounding_boxes: list[dict], device: Optional[DeviceContext] = None
+) -> list[dict]:
+    """Convert the bounding boxes to clickable coordinates on the device."""
+    device = device or get_device()
+    # Gemini returns coordinates in 1000x1000 pixels
+    centers = to_screen(bounding_boxes, device.x_bound, device.y_bound)
 
+    for bounding_box, (x_center, y_center) in zip(bounding_boxes, centers.tolist()):
         bounding_box["x"] = x_center
         bounding_box["y"] = y_center
         bounding_box.pop("box_2d")
@@ -304,30 +700,39 @@ def convert_coordinates(bounding_boxes: list[dict]) -> list[dict]:
     return bounding_boxes
 
 
+# Tools whose response is followed by the screenshot they took
+SCREENSHOT_TOOLS = {
+    "take_screenshot",
+    "tap_at_coordinates",
+    "tap_UI_element",
+    "click_and_screenshot",
+    "navigate_to",
+}
+
+
 def _load_screenshot(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> Optional[LlmResponse]:
     """Before model callback that automatically loads the screenshot."""
+    device = get_device(callback_context)
+
     if llm_request.contents and llm_request.contents[-1].role == "user":
         if llm_request.contents[-1].parts:
             if (
                 llm_request.contents[-1].parts[0].function_response
                 and llm_request.contents[-1].parts[0].function_response.name
-                == "take_screenshot"
+                in SCREENSHOT_TOOLS
             ):
-                screenshot_path = config["SCREENSHOT_LOCATION"]
-                if os.path.exists(screenshot_path):
-                    screenshot_image = Image.open(screenshot_path)
-
-                    with io.BytesIO() as output:
-                        screenshot_image.save(output, format="PNG")
-                        screenshot_bytes = output.getvalue()
-
+                frame = device.frame_store.latest()
+                # ADK rebuilds the contents from the session events every turn
+                # and this image is not one of them, so it is attached even
+                # when the screen did not change
+                if frame is not None:
                     llm_request.contents.append(
                         types.Content(
                             parts=[
                                 types.Part.from_bytes(
-                                    data=screenshot_bytes, mime_type="image/png"
+                                    data=frame.data, mime_type=frame.mime_type
                                 )
                             ],
                             role="user",
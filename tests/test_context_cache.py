@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from google.genai import errors
+
+from phone_agent.tools import vision
+from phone_agent.tools.context_cache import cache_missing
+
+CACHE_NAME = "cachedContents/abc123"
+
+
+def client_error(code: int, status: str, message: str) -> errors.ClientError:
+    return errors.ClientError(
+        code, {"error": {"code": code, "status": status, "message": message}}
+    )
+
+
+class StubCache:
+    def __init__(self):
+        self.invalidated = []
+
+    async def apply(self, model, generation_config):
+        return generation_config.model_copy(update={"cached_content": CACHE_NAME})
+
+    def invalidate(self, name):
+        self.invalidated.append(name)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    stub = StubCache()
+    monkeypatch.setattr(vision, "context_cache", stub)
+    return stub
+
+
+def failing_client(monkeypatch, error):
+    """Fails requests that use the cache with `error`, answers the others."""
+    calls = []
+
+    async def generate_content(model, contents, config):
+        calls.append(config.cached_content)
+        if config.cached_content:
+            raise error
+        return "response"
+
+    monkeypatch.setattr(vision.gemini_client, "generate_content", generate_content)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "error, missing",
+    [
+        (client_error(404, "NOT_FOUND", "Not found"), True),
+        (client_error(403, "PERMISSION_DENIED", "CachedContent not found"), True),
+        (client_error(429, "RESOURCE_EXHAUSTED", "Resource exhausted"), False),
+        (client_error(400, "INVALID_ARGUMENT", "Invalid image"), False),
+        (ValueError("not an API error"), False),
+    ],
+)
+def test_cache_missing(error, missing):
+    assert cache_missing(error) is missing
+
+
+def test_rate_limit_keeps_the_cache(monkeypatch, cache):
+    calls = failing_client(
+        monkeypatch, client_error(429, "RESOURCE_EXHAUSTED", "Resource exhausted")
+    )
+
+    with pytest.raises(errors.ClientError):
+        asyncio.run(vision._generate_content(["prompt"]))
+
+    assert cache.invalidated == []
+    assert calls == [CACHE_NAME]
+
+
+def test_missing_cache_is_dropped_and_sent_uncached(monkeypatch, cache):
+    calls = failing_client(monkeypatch, client_error(404, "NOT_FOUND", "Not found"))
+
+    assert asyncio.run(vision._generate_content(["prompt"])) == "response"
+    assert cache.invalidated == [CACHE_NAME]
+    assert calls == [CACHE_NAME, None]
@@ -0,0 +1,29 @@
+import pytest
+
+from phone_agent.tools.vision import label_matches
+
+
+@pytest.mark.parametrize(
+    "label, query",
+    [
+        ("settings gear icon", "settings gear icon"),
+        ("Settings gear icon", "the settings gear icon"),
+        ("blue settings gear icon", "settings gear icon"),
+    ],
+)
+def test_label_matches(label, query):
+    assert label_matches(label, query)
+
+
+@pytest.mark.parametrize(
+    "label, query",
+    [
+        ("icon", "settings gear icon"),
+        ("button", "the send button"),
+        ("gear icon", "settings gear icon"),
+        ("", "settings gear icon"),
+        ("settings", ""),
+    ],
+)
+def test_generic_label_does_not_match(label, query):
+    assert not label_matches(label, query)